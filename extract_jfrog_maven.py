@@ -6,30 +6,165 @@ Output format: groupId:artifactId:version
 """
 
 import argparse
+import base64
 import csv
+import gzip
+import hashlib
 import json
+import os
+import pickle
 import re
 import sys
-from datetime import datetime, timedelta
+from array import array
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import chain, islice
 from typing import Dict, Set, Tuple, List, Optional
+from urllib.parse import urlsplit
 from urllib.request import Request, urlopen
 from urllib.error import URLError, HTTPError
 
+# Use a pooled session with keep-alive if requests is available, so repeated
+# calls to the same JFrog host (storage API + AQL) reuse one TCP/TLS connection
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    _SESSION = requests.Session()
+    _adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=16,
+        max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 502, 503, 504]),
+    )
+    _SESSION.mount('http://', _adapter)
+    _SESSION.mount('https://', _adapter)
+    # AQL JSON is highly repetitive and compresses 5-10x; requests
+    # decompresses transparently
+    _SESSION.headers['Accept-Encoding'] = 'gzip, deflate'
+except ImportError:
+    requests = None
+    _SESSION = None
+
+# urllib3 without requests still provides a keep-alive connection pool
+if _SESSION is None:
+    try:
+        import urllib3
+        from urllib3.util.retry import Retry
+
+        _POOL = urllib3.PoolManager(
+            maxsize=16,
+            retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 502, 503, 504]),
+        )
+    except ImportError:
+        urllib3 = None
+        _POOL = None
+else:
+    _POOL = None
+
+# ijson lets us parse the AQL response incrementally instead of buffering
+# the whole results array in memory
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# msgspec and orjson both decode large AQL responses several times faster
+# than stdlib json; prefer msgspec, then orjson, then stdlib. All three
+# raise ValueError subclasses on bad input.
+try:
+    import msgspec.json
+    _json_loads = msgspec.json.decode
+except ImportError:
+    try:
+        import orjson
+        _json_loads = orjson.loads
+    except ImportError:
+        _json_loads = json.loads
+
+
+@lru_cache(maxsize=8)
+def _auth_header(auth: Tuple[str, str]) -> str:
+    """Basic auth header value, encoded once per credential pair."""
+    return 'Basic ' + base64.b64encode(f"{auth[0]}:{auth[1]}".encode()).decode()
+
+
+def _pool_request(url: str, auth: Tuple[str, str], method: str, data: bytes, preload_content: bool = True):
+    """Issue a request on the urllib3 pool, reporting errors like fetch_url."""
+    headers = {'Accept-Encoding': 'gzip, deflate'}
+    if data:
+        headers['Content-Type'] = 'text/plain'
+    if auth:
+        headers['Authorization'] = _auth_header(auth)
+
+    try:
+        response = _POOL.request(method, url, body=data, headers=headers,
+                                 timeout=60, preload_content=preload_content)
+    except urllib3.exceptions.HTTPError as e:
+        print(f"Error accessing {url}: {e}", file=sys.stderr)
+        return None
+
+    if response.status >= 400:
+        print(f"HTTP Error {response.status} accessing {url}: {response.reason}", file=sys.stderr)
+        if response.status == 401:
+            print("Authentication failed. Please check your username and password.", file=sys.stderr)
+        error_body = response.data
+        if error_body:
+            print(f"Error details: {error_body.decode('utf-8', 'replace')}", file=sys.stderr)
+        return None
+
+    return response
 
-def fetch_url(url: str, auth: Tuple[str, str] = None, method: str = 'GET', data: bytes = None) -> str:
-    """Fetch URL content with optional authentication."""
+
+def fetch_url(url: str, auth: Tuple[str, str] = None, method: str = 'GET', data: bytes = None) -> Optional[bytes]:
+    """Fetch URL content as bytes with optional authentication.
+
+    Returning bytes avoids an O(N) decode of multi-megabyte AQL responses;
+    the JSON parsers accept bytes directly.
+    """
+    if _SESSION is not None:
+        try:
+            response = _SESSION.request(
+                method, url,
+                data=data,
+                auth=auth,
+                headers={'Content-Type': 'text/plain'} if data else None,
+                timeout=60,
+            )
+            response.raise_for_status()
+            return response.content
+        except requests.HTTPError as e:
+            code = e.response.status_code
+            print(f"HTTP Error {code} accessing {url}: {e.response.reason}", file=sys.stderr)
+            if code == 401:
+                print("Authentication failed. Please check your username and password.", file=sys.stderr)
+            if e.response.text:
+                print(f"Error details: {e.response.text}", file=sys.stderr)
+            return None
+        except requests.RequestException as e:
+            print(f"Error accessing {url}: {e}", file=sys.stderr)
+            return None
+
+    if _POOL is not None:
+        response = _pool_request(url, auth, method, data)
+        return response.data if response is not None else None
+
+    # Fallback: plain urllib (new connection per call)
     try:
         req = Request(url, data=data, method=method)
         if auth:
-            import base64
-            credentials = base64.b64encode(f"{auth[0]}:{auth[1]}".encode()).decode()
-            req.add_header('Authorization', f'Basic {credentials}')
+            req.add_header('Authorization', _auth_header(auth))
 
         if data:
             req.add_header('Content-Type', 'text/plain')
+        req.add_header('Accept-Encoding', 'gzip')
 
         with urlopen(req, timeout=60) as response:
-            return response.read().decode('utf-8')
+            body = response.read()
+            if response.headers.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            return body
     except HTTPError as e:
         print(f"HTTP Error {e.code} accessing {url}: {e.reason}", file=sys.stderr)
         if e.code == 401:
@@ -50,6 +185,69 @@ def fetch_url(url: str, auth: Tuple[str, str] = None, method: str = 'GET', data:
         return None
 
 
+def fetch_url_stream(url: str, auth: Tuple[str, str] = None, method: str = 'GET', data: bytes = None):
+    """
+    Open URL and return a file-like object for incremental reads.
+    Returns None on error. The caller is responsible for closing it.
+    """
+    if _SESSION is not None:
+        try:
+            response = _SESSION.request(
+                method, url,
+                data=data,
+                auth=auth,
+                headers={'Content-Type': 'text/plain'} if data else None,
+                timeout=60,
+                stream=True,
+            )
+            response.raise_for_status()
+            # Transparently decompress so readers see plain JSON bytes
+            response.raw.decode_content = True
+            return response.raw
+        except requests.HTTPError as e:
+            code = e.response.status_code
+            print(f"HTTP Error {code} accessing {url}: {e.response.reason}", file=sys.stderr)
+            if code == 401:
+                print("Authentication failed. Please check your username and password.", file=sys.stderr)
+            if e.response.text:
+                print(f"Error details: {e.response.text}", file=sys.stderr)
+            return None
+        except requests.RequestException as e:
+            print(f"Error accessing {url}: {e}", file=sys.stderr)
+            return None
+
+    if _POOL is not None:
+        # urllib3 responses are file-like and decode gzip on read
+        return _pool_request(url, auth, method, data, preload_content=False)
+
+    # Fallback: plain urllib response object (already file-like)
+    try:
+        req = Request(url, data=data, method=method)
+        if auth:
+            req.add_header('Authorization', _auth_header(auth))
+
+        if data:
+            req.add_header('Content-Type', 'text/plain')
+        req.add_header('Accept-Encoding', 'gzip')
+
+        response = urlopen(req, timeout=60)
+        if response.headers.get('Content-Encoding') == 'gzip':
+            return gzip.GzipFile(fileobj=response)
+        return response
+    except HTTPError as e:
+        print(f"HTTP Error {e.code} accessing {url}: {e.reason}", file=sys.stderr)
+        if e.code == 401:
+            print("Authentication failed. Please check your username and password.", file=sys.stderr)
+        return None
+    except URLError as e:
+        print(f"URL Error accessing {url}: {e.reason}", file=sys.stderr)
+        return None
+    except Exception as e:
+        print(f"Error accessing {url}: {e}", file=sys.stderr)
+        return None
+
+
+@lru_cache(maxsize=32)
 def parse_artifactory_url(url: str) -> Tuple[str, str]:
     """
     Parse JFrog URL to extract base URL and repository name.
@@ -60,16 +258,19 @@ def parse_artifactory_url(url: str) -> Tuple[str, str]:
 
     Returns:
         (base_url, repo_name)
-    """
-    url = url.rstrip('/')
 
-    if '/artifactory/' in url:
-        parts = url.split('/artifactory/')
-        base_url = parts[0] + '/artifactory'
-        repo_name = parts[1]
-    else:
+    Parses via urlsplit (so query strings and fragments are ignored) and is
+    memoized for repeated invocations in multi-URL mode.
+    """
+    parts = urlsplit(url.rstrip('/'))
+    marker = '/artifactory/'
+    idx = parts.path.find(marker)
+    if idx == -1:
         raise ValueError(f"Cannot parse JFrog URL: {url}. Expected format: https://host/artifactory/repo-name")
 
+    base_url = f"{parts.scheme}://{parts.netloc}{parts.path[:idx]}/artifactory"
+    repo_name = parts.path[idx + len(marker):]
+
     return base_url, repo_name
 
 
@@ -83,17 +284,227 @@ def get_actual_repo_name(base_url: str, repo_name: str, auth: Tuple[str, str] =
 
     if result:
         try:
-            data = json.loads(result)
+            data = _json_loads(result)
             actual_name = data.get('repo')
             if actual_name and actual_name != repo_name:
                 print(f"Note: Repository name mapped from '{repo_name}' to '{actual_name}'", file=sys.stderr)
                 return actual_name
-        except json.JSONDecodeError:
+        except ValueError:
             pass
 
     return repo_name
 
 
+# AQL pagination: page size and how many pages to keep in flight at once
+_AQL_PAGE_SIZE = 10000
+_AQL_MAX_CONCURRENT_PAGES = 4
+
+
+def _fetch_aql_page(aql_url: str, base_query: str, auth: Tuple[str, str], offset: int) -> Optional[List[dict]]:
+    """Fetch and parse a single AQL page. Returns the result items, or None on error."""
+    paged_query = f'{base_query}.sort({{"$asc": ["path", "name"]}}).offset({offset}).limit({_AQL_PAGE_SIZE})'
+
+    if ijson is not None:
+        stream = fetch_url_stream(aql_url, auth, method='POST', data=paged_query.encode('utf-8'))
+        if stream is None:
+            return None
+        try:
+            return list(ijson.items(stream, 'results.item'))
+        except Exception as e:
+            print(f"Error parsing JSON response: {e}", file=sys.stderr)
+            return None
+        finally:
+            stream.close()
+
+    result = fetch_url(aql_url, auth, method='POST', data=paged_query.encode('utf-8'))
+    if not result:
+        return None
+    try:
+        data = _json_loads(result)
+    except ValueError as e:
+        print(f"Error parsing JSON response: {e}", file=sys.stderr)
+        return None
+    return data.get('results', [])
+
+
+def _iter_aql_items(aql_url: str, base_query: str, auth: Tuple[str, str]):
+    """
+    Yield AQL result items page by page using .offset()/.limit() pagination.
+
+    One giant query can hit gateway timeouts on big repos; bounded pages avoid
+    that, and upcoming pages are prefetched on worker threads so server-side
+    query time overlaps parsing of the current page. Pages are yielded in
+    offset order, and a server that ignores .offset()/.limit() is detected so
+    every row is still yielded exactly once. Raises RuntimeError if a page
+    fails after reporting the error.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    # First page synchronously: small repos fit in one page and need no threads
+    page = _fetch_aql_page(aql_url, base_query, auth, 0)
+    if page is None:
+        raise RuntimeError("AQL page fetch failed")
+    yield from page
+    if len(page) < _AQL_PAGE_SIZE:
+        return
+    prev_first_row = (page[0]['path'], page[0]['name'])
+
+    with ThreadPoolExecutor(max_workers=_AQL_MAX_CONCURRENT_PAGES) as executor:
+        next_offset = _AQL_PAGE_SIZE
+        pending = {}  # offset -> future, consumed in offset order
+        exhausted = False
+
+        while True:
+            while not exhausted and len(pending) < _AQL_MAX_CONCURRENT_PAGES:
+                pending[next_offset] = executor.submit(_fetch_aql_page, aql_url, base_query, auth, next_offset)
+                next_offset += _AQL_PAGE_SIZE
+
+            if not pending:
+                return
+
+            offset = min(pending)
+            page = pending.pop(offset).result()
+            if page is None:
+                for future in pending.values():
+                    future.cancel()
+                raise RuntimeError("AQL page fetch failed")
+
+            # Artifactory ignores .sort()/.offset()/.limit() when .include()
+            # references fields outside the item domain (e.g. stat.*), and
+            # every "page" is then the full result set. The first page already
+            # yielded everything in that case, so stop when a page restarts
+            # from the same first row instead of re-counting its rows (or
+            # looping forever on repos larger than a page)
+            first_row = (page[0]['path'], page[0]['name']) if page else None
+            if first_row == prev_first_row:
+                print("Warning: server ignored AQL offset/limit; using the complete first response", file=sys.stderr)
+                for future in pending.values():
+                    future.cancel()
+                return
+            prev_first_row = first_row
+
+            yield from page
+            if len(page) < _AQL_PAGE_SIZE:
+                exhausted = True
+                for future in pending.values():
+                    future.cancel()
+                pending.clear()
+
+
+# packaging gives semantically correct version ordering (1.10 > 1.2);
+# fall back to lexicographic comparison if it is not installed
+try:
+    from packaging.version import Version, InvalidVersion
+except ImportError:
+    Version = None
+
+
+@lru_cache(maxsize=None)
+def _version_sort_key(version: str):
+    """
+    Sort key for version strings.
+
+    Versions that packaging can parse sort semantically and before ones it
+    cannot (e.g. 31.1-jre), which fall back to lexicographic order.
+    Cached: the same version strings ("1.0", "2.1.3", ...) recur across
+    thousands of packages, and Version() parsing is regex-heavy.
+    """
+    if Version is not None:
+        try:
+            return (0, Version(version))
+        except InvalidVersion:
+            pass
+    return (1, version)
+
+
+class _PackageStats:
+    """
+    Per-(groupId, artifactId) version stats in struct-of-arrays form.
+
+    Parallel lists plus a version->index map are markedly denser than a dict
+    of per-version [version, last_downloaded, count] lists: download counts
+    pack into an int64 array.array and each version string is stored once.
+    """
+    __slots__ = ('index', 'versions', 'last_downloaded', 'downloads')
+
+    def __init__(self):
+        self.index = {}
+        self.versions = []
+        self.last_downloaded = []
+        self.downloads = array('q')
+
+    def add(self, version: str, last_downloaded: str, download_count: int):
+        """Aggregate one row: sum downloads, keep the latest download date."""
+        i = self.index.get(version)
+        if i is None:
+            self.index[version] = len(self.versions)
+            self.versions.append(version)
+            self.last_downloaded.append(last_downloaded)
+            self.downloads.append(download_count)
+        else:
+            self.downloads[i] += download_count
+            if last_downloaded != 'Never':
+                if self.last_downloaded[i] == 'Never' or last_downloaded > self.last_downloaded[i]:
+                    self.last_downloaded[i] = last_downloaded
+
+    def rows(self):
+        """Iterate (version, last_downloaded, download_count) rows."""
+        return zip(self.versions, self.last_downloaded, self.downloads)
+
+
+# Output-line templates, selected once per run so the format branch stays
+# out of the per-version loop
+_MAVEN_TEMPLATE = (
+    "<dependency>\n"
+    "  <groupId>%s</groupId>\n"
+    "  <artifactId>%s</artifactId>\n"
+    "  <version>%s</version>\n"
+    "</dependency>"
+)
+_GRADLE_TEMPLATE = "implementation '%s:%s:%s'"
+_SIMPLE_TEMPLATE = "%s:%s:%s"
+
+_FORMAT_TEMPLATES = {
+    'maven': _MAVEN_TEMPLATE,
+    'gradle': _GRADLE_TEMPLATE,
+    'simple': _SIMPLE_TEMPLATE,
+}
+
+# Module-level suffix tuples: str.endswith on a tuple is a single C-level
+# scan, vs rebuilding a list literal and looping in Python per artifact.
+# Checksums/signatures (.md5, .sha1, .sha256, .sha512, .asc) need no entry
+# in the skip tuple: they already fail the keep test, so the second scan
+# only has to distinguish classifier jars from primary ones.
+_SKIP_SUFFIXES = ('-sources.jar', '-javadoc.jar', '-tests.jar')
+_KEEP_SUFFIXES = ('.jar', '.pom')
+
+
+@lru_cache(maxsize=None)
+def _parse_path(path: str) -> Optional[Tuple[str, str, str, str]]:
+    """
+    Parse a Maven directory path into (groupId, artifactId, version, expected_prefix).
+
+    Cached: AQL lists several files per version directory (jar + pom), so
+    repeated paths skip the split/join work entirely. Returns None for paths
+    too shallow to carry Maven coordinates.
+    """
+    # Parse path: groupId/artifactId/version/filename. rsplit with
+    # maxsplit=2 plus replace are single C-level passes, vs a full split
+    # followed by a slice and a join
+    path_parts = path.strip('/').rsplit('/', 2)
+
+    if len(path_parts) < 3:
+        return None
+
+    group_id = path_parts[0].replace('/', '.')
+    artifact_id = path_parts[1]
+    version = path_parts[2]
+
+    # Intern group/artifact ids: a repo has few unique (g, a) pairs but many
+    # versions, so repeated keys share one string object and hash by pointer
+    return sys.intern(group_id), sys.intern(artifact_id), version, f"{artifact_id}-{version}"
+
+
 def parse_maven_path(path: str, filename: str) -> Tuple[str, str, str]:
     """
     Extract groupId, artifactId, and version from Maven artifact path.
@@ -102,37 +513,26 @@ def parse_maven_path(path: str, filename: str) -> Tuple[str, str, str]:
     Example: org/springframework/spring-core/5.3.1/spring-core-5.3.1.jar
     Returns: (groupId, artifactId, version)
     """
-    # Skip non-primary artifacts (sources, javadoc, checksums, signatures)
-    if any(filename.endswith(ext) for ext in ['.md5', '.sha1', '.sha256', '.sha512', '.asc', '.pom.asc']):
-        return None, None, None
-
-    # We primarily care about .jar files and .pom files
-    if not (filename.endswith('.jar') or filename.endswith('.pom')):
+    # Skip non-primary artifacts (sources, javadoc, tests, checksums,
+    # signatures); we primarily care about .jar files and .pom files.
+    # The keep test runs first: checksums/signatures fail the short
+    # 2-suffix check without scanning the longer skip tuple
+    if not filename.endswith(_KEEP_SUFFIXES) or filename.endswith(_SKIP_SUFFIXES):
         return None, None, None
 
-    # Skip sources and javadoc
-    if '-sources.jar' in filename or '-javadoc.jar' in filename or '-tests.jar' in filename:
+    parsed = _parse_path(path)
+    if parsed is None:
         return None, None, None
-
-    # Parse path: groupId/artifactId/version/filename
-    path_parts = path.strip('/').split('/')
-
-    if len(path_parts) < 3:
-        return None, None, None
-
-    version = path_parts[-1]
-    artifact_id = path_parts[-2]
-    group_id = '.'.join(path_parts[:-2])
+    group_id, artifact_id, version, expected_prefix = parsed
 
     # Validate that filename matches expected pattern: artifactId-version.extension
-    expected_prefix = f"{artifact_id}-{version}"
     if not filename.startswith(expected_prefix):
         return None, None, None
 
     return group_id, artifact_id, version
 
 
-def get_cached_maven_packages(base_url: str, repo_name: str, auth: Tuple[str, str] = None, debug: bool = False, since_days: int = None, include_stats: bool = False):
+def get_cached_maven_packages(base_url: str, repo_name: str, auth: Tuple[str, str] = None, debug: bool = False, since_days: int = None, include_stats: bool = False, include_poms: bool = False, latest_only: bool = False):
     """
     Use JFrog AQL to query only cached Maven artifacts in the repository.
     Returns a dict mapping (groupId, artifactId) to sets of versions (or version tuples with stats).
@@ -147,8 +547,24 @@ def get_cached_maven_packages(base_url: str, repo_name: str, auth: Tuple[str, st
         aql_query = f'items.find({{"repo": "{repo_name}"}}).include("name", "path", "repo", "type", "stat.downloaded", "stat.downloads").limit(100)'
         print(f"DEBUG MODE: Showing first 100 items in repository", file=sys.stderr)
     else:
-        # Build file type condition
-        file_condition = '"$or": [{"name": {"$match": "*.jar"}}, {"name": {"$match": "*.pom"}}]'
+        # Build file type condition. Exclude sources/javadoc/tests jars
+        # server-side so discarded rows never cross the wire; the
+        # parse_maven_path guards remain as a safety net.
+        # Jars alone identify every (g, a, v) in a typical repo where each
+        # version ships jar + pom, so the pom rows are only requested when
+        # asked for -- roughly halving response volume and loop iterations.
+        if include_poms:
+            name_match = '{"$or": [{"name": {"$match": "*.jar"}}, {"name": {"$match": "*.pom"}}]}'
+        else:
+            name_match = '{"name": {"$match": "*.jar"}}'
+        file_condition = (
+            '"$and": ['
+            f'{name_match}, '
+            '{"name": {"$nmatch": "*-sources.jar"}}, '
+            '{"name": {"$nmatch": "*-javadoc.jar"}}, '
+            '{"name": {"$nmatch": "*-tests.jar"}}, '
+            '{"name": {"$nmatch": "*.pom.asc"}}]'
+        )
 
         # Determine what stats to include
         if include_stats or since_days:
@@ -158,40 +574,56 @@ def get_cached_maven_packages(base_url: str, repo_name: str, auth: Tuple[str, st
 
         # Add date filter if requested
         if since_days:
-            from datetime import timezone
             cutoff_date = datetime.now(timezone.utc) - timedelta(days=since_days)
             # JFrog uses ISO 8601 format: YYYY-MM-DDTHH:MM:SS.sssZ
             cutoff_str = cutoff_date.strftime('%Y-%m-%dT%H:%M:%S.000Z')
-            aql_query = f'items.find({{"repo": "{repo_name}", {file_condition}, "stat.downloaded": {{"$gte": "{cutoff_str}"}}}}).include("name", "path", "repo"{stats_include})'
+            aql_query = f'items.find({{"repo": "{repo_name}", {file_condition}, "stat.downloaded": {{"$gte": "{cutoff_str}"}}}}).include("name", "path"{stats_include})'
             print(f"Filtering packages downloaded since {cutoff_str} ({since_days} days ago)", file=sys.stderr)
         else:
             # AQL query to find all Maven artifacts (.jar and .pom files)
-            aql_query = f'items.find({{"repo": "{repo_name}", {file_condition}}}).include("name", "path", "repo"{stats_include})'
+            aql_query = f'items.find({{"repo": "{repo_name}", {file_condition}}}).include("name", "path"{stats_include})'
 
     print(f"Querying cached artifacts in {repo_name}...", file=sys.stderr)
     if debug:
         print(f"AQL Query: {aql_query}", file=sys.stderr)
 
-    result = fetch_url(aql_url, auth, method='POST', data=aql_query.encode('utf-8'))
+    stream = None
+    if not debug:
+        # Paginated fetch; pages are prefetched concurrently
+        items = _iter_aql_items(aql_url, aql_query, auth)
+    elif ijson is not None:
+        # Debug query already carries .limit(100): fetch it in one shot.
+        # Stream-parse: items are yielded one at a time, so the full results
+        # array never needs to fit in memory
+        stream = fetch_url_stream(aql_url, auth, method='POST', data=aql_query.encode('utf-8'))
+        if stream is None:
+            return {}
+        items = ijson.items(stream, 'results.item')
+    else:
+        result = fetch_url(aql_url, auth, method='POST', data=aql_query.encode('utf-8'))
 
-    if not result:
-        return {}
+        if not result:
+            return {}
 
-    try:
-        data = json.loads(result)
-    except json.JSONDecodeError as e:
-        print(f"Error parsing JSON response: {e}", file=sys.stderr)
-        return {}
+        try:
+            data = _json_loads(result)
+        except ValueError as e:
+            print(f"Error parsing JSON response: {e}", file=sys.stderr)
+            return {}
 
-    if 'results' not in data:
-        print("No results found in AQL response", file=sys.stderr)
-        return {}
+        if 'results' not in data:
+            print("No results found in AQL response", file=sys.stderr)
+            return {}
 
-    print(f"Found {len(data['results'])} cached artifacts", file=sys.stderr)
+        items = data['results']
 
     if debug:
+        # Materialize exactly 20 items for the preview, then chain them back
+        # in front of the remaining iterator so parsing resumes seamlessly
+        items = iter(items)
+        preview = list(islice(items, 20))
         print("\nDEBUG: First 20 items in repository:", file=sys.stderr)
-        for item in data['results'][:20]:
+        for item in preview:
             item_type = item.get('type', 'unknown')
             path = item.get('path', '')
             name = item.get('name', '')
@@ -199,54 +631,186 @@ def get_cached_maven_packages(base_url: str, repo_name: str, auth: Tuple[str, st
             downloaded = stats[0].get('downloaded') if stats else 'N/A'
             print(f"  [{item_type}] {path}/{name} (downloaded: {downloaded})", file=sys.stderr)
         print(file=sys.stderr)
+        items = chain(preview, items)
+
+    # Parse results and group by (groupId, artifactId). defaultdict removes
+    # the membership check per row; since AQL returns rows sorted by path,
+    # consecutive rows usually share a key, so the dict lookup itself is
+    # amortized to roughly once per (groupId, artifactId)
+    # latest_only keeps a single running-max version string per package
+    # instead of the full version set: O(1) memory per package
+    if include_stats:
+        packages = defaultdict(_PackageStats)
+    elif latest_only:
+        packages = {}
+    else:
+        packages = defaultdict(set)
+    last_key = None
+    last_container = None
+    item_count = 0
 
-    # Parse results and group by (groupId, artifactId)
-    packages = {}
+    # Bind the parser to a local: the loop runs once per artifact and local
+    # loads are cheaper than module-global lookups
+    parse = parse_maven_path
 
-    for item in data['results']:
-        filename = item.get('name', '')
-        path = item.get('path', '')
+    try:
+        for item in items:
+            item_count += 1
+            filename = item.get('name', '')
+            path = item.get('path', '')
 
-        # Skip folders
-        if item.get('type') == 'folder':
-            continue
+            # Extract Maven coordinates
+            group_id, artifact_id, version = parse(path, filename)
 
-        # Extract Maven coordinates
-        group_id, artifact_id, version = parse_maven_path(path, filename)
+            if not group_id or not artifact_id or not version:
+                if debug:
+                    print(f"DEBUG: Could not parse Maven coordinates from: {path}/{filename}", file=sys.stderr)
+                continue
 
-        if not group_id or not artifact_id or not version:
-            if debug:
-                print(f"DEBUG: Could not parse Maven coordinates from: {path}/{filename}", file=sys.stderr)
-            continue
+            key = (group_id, artifact_id)
 
-        # Extract stats if requested
-        if include_stats:
-            stats = item.get('stats', [])
-            last_downloaded = stats[0].get('downloaded', 'Never') if stats else 'Never'
-            download_count = stats[0].get('downloads', 0) if stats else 0
+            if latest_only and not include_stats:
+                cur = packages.get(key)
+                if cur is None or _version_sort_key(version) > _version_sort_key(cur):
+                    packages[key] = version
+                continue
 
-            # Aggregate per (group_id, artifact_id, version): sum downloads, keep latest download date
-            key = (group_id, artifact_id)
-            if key not in packages:
-                packages[key] = {}
-            if version not in packages[key]:
-                packages[key][version] = [version, last_downloaded, download_count]
+            if key != last_key:
+                last_key = key
+                last_container = packages[key]
+
+            # Extract stats if requested
+            if include_stats:
+                stats = item.get('stats', [])
+                last_downloaded = stats[0].get('downloaded', 'Never') if stats else 'Never'
+                download_count = stats[0].get('downloads', 0) if stats else 0
+
+                # Aggregate per (group_id, artifact_id, version): sum downloads, keep latest download date
+                last_container.add(version, last_downloaded, download_count)
             else:
-                existing = packages[key][version]
-                existing[2] += download_count
-                if last_downloaded != 'Never':
-                    if existing[1] == 'Never' or last_downloaded > existing[1]:
-                        existing[1] = last_downloaded
-        else:
-            # Add to packages dict without stats
-            key = (group_id, artifact_id)
-            if key not in packages:
-                packages[key] = set()
-            packages[key].add(version)
+                # Add version without stats
+                last_container.add(version)
+    except Exception as e:
+        # Failed page fetch, or truncated/malformed JSON mid-stream
+        print(f"Error processing AQL response: {e}", file=sys.stderr)
+        return {}
+    finally:
+        if stream is not None:
+            stream.close()
+
+    print(f"Found {item_count} cached artifacts", file=sys.stderr)
+
+    if not packages and not include_poms and not debug:
+        # Pom-packaged repositories (BOMs, parents) have no jars at all;
+        # retry with pom files included before reporting an empty cache
+        print("No jar artifacts found; retrying with pom files included", file=sys.stderr)
+        return get_cached_maven_packages(base_url, repo_name, auth, debug=debug,
+                                         since_days=since_days, include_stats=include_stats,
+                                         include_poms=True, latest_only=latest_only)
+
+    # Hand back a plain dict: downstream lookups on a defaultdict would
+    # silently create empty entries for missing keys
+    return dict(packages)
+
+
+def _repo_freshness_marker(base_url: str, repo_name: str, auth: Tuple[str, str] = None) -> Optional[str]:
+    """
+    Return the newest 'modified' timestamp in the repository, or None.
+    A single-row AQL query, used to decide whether a disk-cached result
+    is still current without re-downloading the full artifact listing.
+    """
+    aql_url = f"{base_url}/api/search/aql"
+    query = f'items.find({{"repo": "{repo_name}"}}).include("modified").sort({{"$desc": ["modified"]}}).limit(1)'
+    result = fetch_url(aql_url, auth, method='POST', data=query.encode('utf-8'))
+    if not result:
+        return None
+    try:
+        data = _json_loads(result)
+    except ValueError:
+        return None
+    results = data.get('results') or []
+    return results[0].get('modified') if results else None
+
+
+def _packages_cache_path(cache_dir: str, base_url: str, repo_name: str, since_days: int, include_stats: bool, include_poms: bool, latest_only: bool) -> str:
+    """Cache file path for one (repo, query shape) combination."""
+    key = f"{base_url}|{repo_name}|{since_days}|{include_stats}|{include_poms}|{latest_only}"
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, f"maven-{repo_name}-{digest}.pkl.gz")
+
+
+def get_cached_maven_packages_with_cache(base_url: str, repo_name: str, auth: Tuple[str, str] = None,
+                                         debug: bool = False, since_days: int = None,
+                                         include_stats: bool = False, include_poms: bool = False,
+                                         latest_only: bool = False, cache_dir: str = None):
+    """
+    Wrapper around get_cached_maven_packages that persists the parsed result
+    to cache_dir and reuses it while the repository's newest 'modified'
+    timestamp is unchanged. Repositories change far less often than this
+    script runs, so a fresh cache hit skips the full AQL download entirely.
+    """
+    if not cache_dir or debug:
+        return get_cached_maven_packages(base_url, repo_name, auth, debug=debug,
+                                         since_days=since_days, include_stats=include_stats,
+                                         include_poms=include_poms, latest_only=latest_only)
+
+    cache_path = _packages_cache_path(cache_dir, base_url, repo_name, since_days, include_stats, include_poms, latest_only)
+    marker = _repo_freshness_marker(base_url, repo_name, auth)
+
+    if marker is not None and os.path.exists(cache_path):
+        try:
+            with gzip.open(cache_path, 'rb') as f:
+                cached_marker, packages = pickle.load(f)
+            if cached_marker == marker:
+                print(f"Using cached results for {repo_name} (unchanged since {marker})", file=sys.stderr)
+                return packages
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            pass  # corrupt or stale cache file: fall through and refetch
+
+    packages = get_cached_maven_packages(base_url, repo_name, auth, debug=debug,
+                                         since_days=since_days, include_stats=include_stats,
+                                         include_poms=include_poms, latest_only=latest_only)
+
+    if packages and marker is not None:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with gzip.open(cache_path, 'wb') as f:
+                pickle.dump((marker, packages), f)
+        except OSError as e:
+            print(f"Warning: could not write cache file {cache_path}: {e}", file=sys.stderr)
 
     return packages
 
 
+def _merge_packages(repo_results: List[dict], include_stats: bool, latest_only: bool = False) -> dict:
+    """
+    Merge per-repository package dicts into one, using the same per-version
+    aggregation as the extraction loop (sum downloads, keep latest date;
+    in latest_only mode, the max of the per-repo maxima).
+    """
+    if latest_only and not include_stats:
+        merged = {}
+        for packages in repo_results:
+            for key, version in packages.items():
+                cur = merged.get(key)
+                if cur is None or _version_sort_key(version) > _version_sort_key(cur):
+                    merged[key] = version
+        return merged
+
+    merged = defaultdict(_PackageStats) if include_stats else defaultdict(set)
+
+    for packages in repo_results:
+        for key, version_data in packages.items():
+            if include_stats:
+                container = merged[key]
+                for version, last_downloaded, download_count in version_data.rows():
+                    container.add(version, last_downloaded, download_count)
+            else:
+                merged[key] |= version_data
+
+    return dict(merged)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Extract Maven packages from JFrog Artifactory cache (not upstream)',
@@ -264,7 +828,8 @@ Note: This script queries ONLY cached artifacts in JFrog, not the upstream repos
     parser.add_argument(
         '--url',
         required=True,
-        help='JFrog Artifactory Maven repository URL'
+        action='append',
+        help='JFrog Artifactory Maven repository URL (repeat or comma-separate to query several repositories)'
     )
 
     parser.add_argument(
@@ -318,6 +883,17 @@ Note: This script queries ONLY cached artifacts in JFrog, not the upstream repos
         help='Output CSV file with download statistics (groupId, artifactId, version, package_version, last_downloaded, download_count)'
     )
 
+    parser.add_argument(
+        '--cache-dir',
+        help='Directory for caching parsed results between runs; reused while the repository is unchanged (note: download statistics are only refreshed when repository contents change)'
+    )
+
+    parser.add_argument(
+        '--include-poms',
+        action='store_true',
+        help='Also query .pom files (default: .jar only, which halves the response for typical repos; pom-only repositories are detected and retried automatically)'
+    )
+
     args = parser.parse_args()
 
     auth = None
@@ -327,25 +903,45 @@ Note: This script queries ONLY cached artifacts in JFrog, not the upstream repos
         print("Error: Both --username and --password must be provided together", file=sys.stderr)
         sys.exit(1)
 
-    # Parse the URL
-    try:
-        base_url, repo_name = parse_artifactory_url(args.url)
-        print(f"JFrog Base URL: {base_url}", file=sys.stderr)
-        print(f"Repository: {repo_name}", file=sys.stderr)
+    # Parse the URLs (repeatable flag; each value may be comma-separated)
+    urls = [u for value in args.url for u in value.split(',') if u]
 
-        # Get the actual repository name (may be different due to cache suffix)
-        actual_repo_name = get_actual_repo_name(base_url, repo_name, auth)
+    try:
+        targets = []
+        for url in urls:
+            base_url, repo_name = parse_artifactory_url(url)
+            print(f"JFrog Base URL: {base_url}", file=sys.stderr)
+            print(f"Repository: {repo_name}", file=sys.stderr)
+
+            # Get the actual repository name (may be different due to cache suffix)
+            targets.append((base_url, get_actual_repo_name(base_url, repo_name, auth)))
         print(file=sys.stderr)
     except ValueError as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
 
     # Get cached packages using AQL
-    # Include stats if CSV output is requested
+    # Include stats if CSV output is requested; since_days is always pushed
+    # into the AQL query so filtered rows never leave the server
     include_stats = bool(args.csv_output)
-    # Only apply since_days filter in AQL if NOT using CSV output (CSV gets all packages)
-    aql_since_days = None if args.csv_output else args.since_days
-    packages = get_cached_maven_packages(base_url, actual_repo_name, auth, debug=args.debug, since_days=aql_since_days, include_stats=include_stats)
+    # Latest-only text output needs just one version per package: reduce to a
+    # running max during parsing instead of materializing full version sets
+    latest_only = not args.all_versions and not include_stats
+    if len(targets) == 1:
+        base_url, actual_repo_name = targets[0]
+        packages = get_cached_maven_packages_with_cache(base_url, actual_repo_name, auth, debug=args.debug, since_days=args.since_days, include_stats=include_stats, include_poms=args.include_poms, latest_only=latest_only, cache_dir=args.cache_dir)
+    else:
+        # Multiple repos: runtime is dominated by waiting on JFrog, so run
+        # the extractions concurrently and merge the per-repo results
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(4, len(targets))) as executor:
+            futures = [
+                executor.submit(get_cached_maven_packages_with_cache, base, repo, auth,
+                                debug=args.debug, since_days=args.since_days, include_stats=include_stats,
+                                include_poms=args.include_poms, latest_only=latest_only, cache_dir=args.cache_dir)
+                for base, repo in targets
+            ]
+            packages = _merge_packages([future.result() for future in futures], include_stats, latest_only)
 
     if not packages:
         if args.debug:
@@ -371,25 +967,33 @@ Note: This script queries ONLY cached artifacts in JFrog, not the upstream repos
             sys.exit(1)
         packages = filtered
 
+    # Both output phases visit packages in the same order; sort the keys once
+    sorted_keys = sorted(packages.keys())
+
     # Handle CSV output (with statistics)
     if args.csv_output and not args.debug:
         try:
-            with open(args.csv_output, 'w', newline='') as csvfile:
+            # 1 MiB buffer: the writer emits one small write per row, and the
+            # default 8 KiB buffer would flush every few dozen rows
+            with open(args.csv_output, 'w', newline='', buffering=1 << 20) as csvfile:
                 writer = csv.writer(csvfile)
                 writer.writerow(['groupId', 'artifactId', 'version', 'package_version', 'last_downloaded', 'download_count'])
 
-                csv_rows = []
-                for (group_id, artifact_id) in sorted(packages.keys()):
-                    version_stats = packages[(group_id, artifact_id)]  # Dict of version -> [version, last_downloaded, download_count]
-                    for version, last_downloaded, download_count in version_stats.values():
+                # Stream rows straight to the writer: keys are visited in
+                # sorted order and versions per package via _version_sort_key,
+                # so no rows need buffering. Note the version order is
+                # intentionally semantic (1.2 before 1.10), not the plain
+                # string sort earlier releases used
+                csv_row_count = 0
+                for (group_id, artifact_id) in sorted_keys:
+                    version_stats = packages[(group_id, artifact_id)]  # _PackageStats
+                    for version, last_downloaded, download_count in sorted(
+                            version_stats.rows(), key=lambda row: _version_sort_key(row[0])):
                         package_version = f"{group_id}:{artifact_id}:{version}"
-                        csv_rows.append([group_id, artifact_id, version, package_version, last_downloaded, download_count])
-
-                # Sort by groupId:artifactId, then version
-                csv_rows.sort(key=lambda x: (x[0], x[1], x[2]))
-                writer.writerows(csv_rows)
+                        writer.writerow([group_id, artifact_id, version, package_version, last_downloaded, download_count])
+                        csv_row_count += 1
 
-            print(f"Successfully wrote {len(csv_rows)} package-version entries to {args.csv_output}", file=sys.stderr)
+            print(f"Successfully wrote {csv_row_count} package-version entries to {args.csv_output}", file=sys.stderr)
         except Exception as e:
             print(f"Error writing CSV file {args.csv_output}: {e}", file=sys.stderr)
             sys.exit(1)
@@ -397,60 +1001,41 @@ Note: This script queries ONLY cached artifacts in JFrog, not the upstream repos
     # Generate output
     if not args.debug and (args.output or not args.csv_output):
         results = []
+        template = _FORMAT_TEMPLATES[args.format]
 
-        # If since_days is used with CSV output, we need to filter here
-        cutoff_date_str = None
-        if args.since_days and args.csv_output:
-            from datetime import timezone
-            cutoff_date = datetime.now(timezone.utc) - timedelta(days=args.since_days)
-            cutoff_date_str = cutoff_date.isoformat()
-
-        for (group_id, artifact_id) in sorted(packages.keys()):
+        for (group_id, artifact_id) in sorted_keys:
             version_data = packages[(group_id, artifact_id)]
 
-            # Handle both data structures: set of strings or list of tuples
+            # latest_only already reduced each entry to one version string
+            if latest_only:
+                results.append(template % (group_id, artifact_id, version_data))
+                continue
+
+            # Handle both data structures: set of strings or _PackageStats
             if include_stats:
-                # Extract versions from aggregated dict (version -> [version, last_downloaded, download_count])
-                # Apply date filter if needed
-                if cutoff_date_str:
-                    versions = {
-                        v for v, dl, dc in version_data.values()
-                        if dl != 'Never' and dl >= cutoff_date_str
-                    }
-                else:
-                    versions = set(version_data.keys())
+                versions = version_data.versions
             else:
                 versions = version_data
 
-            # Skip if no versions match the filter
             if not versions:
                 continue
 
             if args.all_versions:
-                for version in sorted(versions):
-                    if args.format == 'maven':
-                        results.append(f"<dependency>\n  <groupId>{group_id}</groupId>\n  <artifactId>{artifact_id}</artifactId>\n  <version>{version}</version>\n</dependency>")
-                    elif args.format == 'gradle':
-                        results.append(f"implementation '{group_id}:{artifact_id}:{version}'")
-                    else:  # simple
-                        results.append(f"{group_id}:{artifact_id}:{version}")
+                results.extend(template % (group_id, artifact_id, version)
+                               for version in sorted(versions, key=_version_sort_key))
             else:
-                # Get latest version
-                latest = sorted(versions)[-1]  # Simple sort, may not handle all version schemes perfectly
-                if args.format == 'maven':
-                    results.append(f"<dependency>\n  <groupId>{group_id}</groupId>\n  <artifactId>{artifact_id}</artifactId>\n  <version>{latest}</version>\n</dependency>")
-                elif args.format == 'gradle':
-                    results.append(f"implementation '{group_id}:{artifact_id}:{latest}'")
-                else:  # simple
-                    results.append(f"{group_id}:{artifact_id}:{latest}")
-
-        # Output results
+                # Get latest version in one pass
+                latest = max(versions, key=_version_sort_key)
+                results.append(template % (group_id, artifact_id, latest))
+
+        # Output results: one joined write instead of a per-line loop
+        payload = '\n'.join(results) + '\n' if results else ''
+
         if args.output:
             # Write to file
             try:
-                with open(args.output, 'w') as f:
-                    for result in results:
-                        f.write(result + '\n')
+                with open(args.output, 'w', buffering=1 << 20) as f:
+                    f.write(payload)
                 print(f"Successfully wrote {len(results)} package{'s' if len(results) != 1 else ''} to {args.output}", file=sys.stderr)
             except Exception as e:
                 print(f"Error writing to file {args.output}: {e}", file=sys.stderr)
@@ -461,8 +1046,7 @@ Note: This script queries ONLY cached artifacts in JFrog, not the upstream repos
                 print("# Cached Maven packages and versions:", file=sys.stderr)
                 print(file=sys.stderr)
 
-                for result in results:
-                    print(result)
+                sys.stdout.write(payload)
 
                 print(file=sys.stderr)
                 print(f"Total: {len(results)} package version{'s' if len(results) != 1 else ''}", file=sys.stderr)
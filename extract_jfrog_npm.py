@@ -7,29 +7,187 @@ Output format: package@version
 
 import argparse
 import csv
+import gzip
+import hashlib
 import json
+import os
+import pickle
 import re
 import sys
-from datetime import datetime, timedelta
+from array import array
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
 from typing import Dict, Set, Tuple, Union
+from functools import lru_cache
+from itertools import chain, islice
 from urllib.request import Request, urlopen
 from urllib.error import URLError, HTTPError
 
+# Use a pooled session with keep-alive if requests is available, so the
+# storage API call and the AQL POST to the same JFrog host reuse one TCP/TLS
+# connection
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    _SESSION = requests.Session()
+    _adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+    _SESSION.mount('http://', _adapter)
+    _SESSION.mount('https://', _adapter)
+    # AQL JSON is highly repetitive and compresses 5-10x; requests
+    # decompresses transparently
+    _SESSION.headers['Accept-Encoding'] = 'gzip, deflate'
+except ImportError:
+    requests = None
+    _SESSION = None
+
+# urllib3 without requests still provides a keep-alive connection pool
+if _SESSION is None:
+    try:
+        import urllib3
+
+        _POOL = urllib3.PoolManager(maxsize=4)
+    except ImportError:
+        urllib3 = None
+        _POOL = None
+else:
+    _POOL = None
+
+# ijson lets us parse the AQL response incrementally instead of buffering
+# the whole results array in memory
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# msgspec and orjson both decode large AQL responses several times faster
+# than stdlib json; prefer msgspec, then orjson, then stdlib. All three
+# raise ValueError subclasses on bad input.
+try:
+    import msgspec.json
+    _json_loads = msgspec.json.decode
+except ImportError:
+    try:
+        import orjson
+        _json_loads = orjson.loads
+    except ImportError:
+        _json_loads = json.loads
+
+# Compiled once at import: this runs for every artifact row in the
+# fallback version sort
+_VERSION_SPLIT_RE = re.compile(r'[.\-]')
+
+# packaging gives semantically correct version ordering (1.10 > 1.2);
+# fall back to simple numeric sorting if it is not installed. The parse is
+# memoized: common version strings (1.0.0, 0.0.1, ...) recur across
+# thousands of packages and packaging's PEP 440 parse is regex-heavy.
+try:
+    from packaging.version import parse as _packaging_parse
+    _parse_version = lru_cache(maxsize=None)(_packaging_parse)
+except ImportError:
+    _parse_version = None
+
+
+@lru_cache(maxsize=None)
+def _fallback_version_key(v: str):
+    """Numeric-aware sort key used when packaging is not installed."""
+    parts = []
+    for part in _VERSION_SPLIT_RE.split(v):
+        try:
+            parts.append(int(part))
+        except ValueError:
+            parts.append(part)
+    return tuple(parts)
+
+
+def _split_name_version(name_without_ext: str) -> Tuple[str, str]:
+    """
+    Split '<name>-<version>' at the last '-' that is followed by a digit.
+
+    Scanning from the right with str.rfind stays in C and, unlike the old
+    lazy regex (which stopped at the FIRST '-<digit>' boundary), handles
+    digit-suffixed package names like apidom-ns-openapi-3-0-1.0.0.tgz
+    correctly: the version starts at the last such boundary.
+    """
+    idx = name_without_ext.rfind('-')
+    while idx > 0 and not name_without_ext[idx + 1:idx + 2].isdigit():
+        idx = name_without_ext.rfind('-', 0, idx)
+    if idx <= 0 or idx == len(name_without_ext) - 1:
+        return None, None
+    return name_without_ext[:idx], name_without_ext[idx + 1:]
+
+
+@lru_cache(maxsize=8)
+def _auth_header(auth: Tuple[str, str]) -> str:
+    """Basic auth header value, encoded once per credential pair."""
+    import base64
+    return 'Basic ' + base64.b64encode(f"{auth[0]}:{auth[1]}".encode()).decode()
+
+
+def fetch_url(url: str, auth: Tuple[str, str] = None, method: str = 'GET', data: bytes = None) -> bytes:
+    """Fetch URL content as bytes with optional authentication.
 
-def fetch_url(url: str, auth: Tuple[str, str] = None, method: str = 'GET', data: bytes = None) -> str:
-    """Fetch URL content with optional authentication."""
+    Returning bytes avoids an O(N) decode of multi-megabyte AQL responses;
+    the JSON parsers accept bytes directly.
+    """
+    if _SESSION is not None:
+        try:
+            response = _SESSION.request(
+                method, url,
+                data=data,
+                auth=auth,
+                headers={'Content-Type': 'text/plain'} if data else None,
+                timeout=60,
+            )
+            response.raise_for_status()
+            return response.content
+        except requests.HTTPError as e:
+            code = e.response.status_code
+            print(f"HTTP Error {code} accessing {url}: {e.response.reason}", file=sys.stderr)
+            if code == 401:
+                print("Authentication failed. Please check your username and password.", file=sys.stderr)
+            if e.response.text:
+                print(f"Error details: {e.response.text}", file=sys.stderr)
+            return None
+        except requests.RequestException as e:
+            print(f"Error accessing {url}: {e}", file=sys.stderr)
+            return None
+
+    if _POOL is not None:
+        headers = {'Accept-Encoding': 'gzip, deflate'}
+        if data:
+            headers['Content-Type'] = 'text/plain'
+        if auth:
+            headers['Authorization'] = _auth_header(auth)
+        try:
+            response = _POOL.request(method, url, body=data, headers=headers, timeout=60)
+        except urllib3.exceptions.HTTPError as e:
+            print(f"Error accessing {url}: {e}", file=sys.stderr)
+            return None
+        if response.status >= 400:
+            print(f"HTTP Error {response.status} accessing {url}: {response.reason}", file=sys.stderr)
+            if response.status == 401:
+                print("Authentication failed. Please check your username and password.", file=sys.stderr)
+            if response.data:
+                print(f"Error details: {response.data.decode('utf-8', 'replace')}", file=sys.stderr)
+            return None
+        return response.data
+
+    # Fallback: plain urllib (new connection per call)
     try:
         req = Request(url, data=data, method=method)
         if auth:
-            import base64
-            credentials = base64.b64encode(f"{auth[0]}:{auth[1]}".encode()).decode()
-            req.add_header('Authorization', f'Basic {credentials}')
+            req.add_header('Authorization', _auth_header(auth))
 
         if data:
             req.add_header('Content-Type', 'text/plain')
+        req.add_header('Accept-Encoding', 'gzip')
 
         with urlopen(req, timeout=60) as response:
-            return response.read().decode('utf-8')
+            body = response.read()
+            if response.headers.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            return body
     except HTTPError as e:
         print(f"HTTP Error {e.code} accessing {url}: {e.reason}", file=sys.stderr)
         if e.code == 401:
@@ -50,6 +208,80 @@ def fetch_url(url: str, auth: Tuple[str, str] = None, method: str = 'GET', data:
         return None
 
 
+def fetch_url_stream(url: str, auth: Tuple[str, str] = None, method: str = 'GET', data: bytes = None):
+    """
+    Open URL and return a file-like object for incremental reads.
+    Returns None on error. The caller is responsible for closing it.
+    """
+    if _SESSION is not None:
+        try:
+            response = _SESSION.request(
+                method, url,
+                data=data,
+                auth=auth,
+                headers={'Content-Type': 'text/plain'} if data else None,
+                timeout=60,
+                stream=True,
+            )
+            response.raise_for_status()
+            # Transparently decompress so readers see plain JSON bytes
+            response.raw.decode_content = True
+            return response.raw
+        except requests.HTTPError as e:
+            code = e.response.status_code
+            print(f"HTTP Error {code} accessing {url}: {e.response.reason}", file=sys.stderr)
+            if code == 401:
+                print("Authentication failed. Please check your username and password.", file=sys.stderr)
+            return None
+        except requests.RequestException as e:
+            print(f"Error accessing {url}: {e}", file=sys.stderr)
+            return None
+
+    if _POOL is not None:
+        headers = {'Accept-Encoding': 'gzip, deflate'}
+        if data:
+            headers['Content-Type'] = 'text/plain'
+        if auth:
+            headers['Authorization'] = _auth_header(auth)
+        try:
+            response = _POOL.request(method, url, body=data, headers=headers,
+                                     timeout=60, preload_content=False)
+        except urllib3.exceptions.HTTPError as e:
+            print(f"Error accessing {url}: {e}", file=sys.stderr)
+            return None
+        if response.status >= 400:
+            print(f"HTTP Error {response.status} accessing {url}: {response.reason}", file=sys.stderr)
+            if response.status == 401:
+                print("Authentication failed. Please check your username and password.", file=sys.stderr)
+            response.release_conn()
+            return None
+        return response
+
+    # Fallback: plain urllib
+    try:
+        req = Request(url, data=data, method=method)
+        if auth:
+            req.add_header('Authorization', _auth_header(auth))
+        if data:
+            req.add_header('Content-Type', 'text/plain')
+        req.add_header('Accept-Encoding', 'gzip')
+        response = urlopen(req, timeout=60)
+        if response.headers.get('Content-Encoding') == 'gzip':
+            return gzip.GzipFile(fileobj=response)
+        return response
+    except HTTPError as e:
+        print(f"HTTP Error {e.code} accessing {url}: {e.reason}", file=sys.stderr)
+        if e.code == 401:
+            print("Authentication failed. Please check your username and password.", file=sys.stderr)
+        return None
+    except URLError as e:
+        print(f"URL Error accessing {url}: {e.reason}", file=sys.stderr)
+        return None
+    except Exception as e:
+        print(f"Error accessing {url}: {e}", file=sys.stderr)
+        return None
+
+
 def parse_artifactory_url(url: str) -> Tuple[str, str]:
     """
     Parse JFrog URL to extract base URL and repository name.
@@ -88,12 +320,12 @@ def get_actual_repo_name(base_url: str, repo_name: str, auth: Tuple[str, str] =
 
     if result:
         try:
-            data = json.loads(result)
+            data = _json_loads(result)
             actual_name = data.get('repo')
             if actual_name and actual_name != repo_name:
                 print(f"Note: Repository name mapped from '{repo_name}' to '{actual_name}'", file=sys.stderr)
                 return actual_name
-        except json.JSONDecodeError:
+        except ValueError:
             pass
 
     return repo_name
@@ -107,20 +339,20 @@ def _extract_version(name_without_ext: str, package_name: str) -> str:
     package names like apidom-ns-json-schema-draft-6 (where the lazy regex would
     produce version "6-1.0.0" instead of "1.0.0").
     """
-    short_name = package_name.split('/')[-1]
-    for prefix_name in [short_name, package_name.replace('/', '-')]:
+    short_name = package_name.rsplit('/', 1)[-1]
+    flat_name = package_name.replace('/', '-')
+    # Unscoped names have no '/', so both candidate prefixes are identical;
+    # probe only once in that case
+    for prefix_name in ((short_name,) if flat_name == short_name else (short_name, flat_name)):
         prefix = prefix_name + '-'
         if name_without_ext.startswith(prefix):
             version = name_without_ext[len(prefix):]
             if version and version[0].isdigit():
                 return version
-    # Fallback: regex (handles edge cases not covered by prefix match)
-    match = re.match(r'^(.+?)-(\d+[\d\.\-\w]*)$', name_without_ext)
-    if match:
-        version = match.group(2)
-        if version and version[0].isdigit():
-            return version
-    return None
+    # Fallback: split at the last '-<digit>' boundary (handles edge cases
+    # not covered by prefix match)
+    _, version = _split_name_version(name_without_ext)
+    return version
 
 
 def parse_npm_metadata(path: str, filename: str) -> Tuple[str, str]:
@@ -211,15 +443,8 @@ def parse_npm_metadata(path: str, filename: str) -> Tuple[str, str]:
             return None, None
         else:
             # Format C: Package name NOT in path, extract from filename
-            match = re.match(r'^(.+?)-(\d+[\d\.\-\w]*)$', name_without_ext)
-            if not match:
-                return None, None
-
-            package_name_from_filename = match.group(1)
-            version = match.group(2)
-
-            # Validate version looks reasonable
-            if not (version and version[0].isdigit()):
+            package_name_from_filename, version = _split_name_version(name_without_ext)
+            if not version:
                 return None, None
 
             # Convert package name from filename format to proper npm format
@@ -247,12 +472,109 @@ def parse_npm_metadata(path: str, filename: str) -> Tuple[str, str]:
     return None, None
 
 
-def get_cached_npm_packages(base_url: str, repo_name: str, auth: Tuple[str, str] = None, debug: bool = False, since_days: int = None, include_stats: bool = False) -> Union[Dict[str, Set[str]], Dict[str, Dict[str, Tuple[str, str, int]]]]:
+_AQL_PAGE_SIZE = 10000
+_AQL_MAX_CONCURRENT_PAGES = 4
+
+
+def _fetch_aql_page(aql_url: str, base_query: str, auth: Tuple[str, str], offset: int):
+    """Fetch and parse a single AQL page. Returns the result items, or None on error."""
+    paged_query = f'{base_query}.sort({{"$asc": ["path", "name"]}}).offset({offset}).limit({_AQL_PAGE_SIZE})'
+
+    if ijson is not None:
+        stream = fetch_url_stream(aql_url, auth, method='POST', data=paged_query.encode('utf-8'))
+        if stream is None:
+            return None
+        try:
+            return list(ijson.items(stream, 'results.item'))
+        except Exception as e:
+            print(f"Error parsing JSON response: {e}", file=sys.stderr)
+            return None
+        finally:
+            stream.close()
+
+    result = fetch_url(aql_url, auth, method='POST', data=paged_query.encode('utf-8'))
+    if not result:
+        return None
+    try:
+        data = _json_loads(result)
+    except ValueError as e:
+        print(f"Error parsing JSON response: {e}", file=sys.stderr)
+        return None
+    return data.get('results', [])
+
+
+def _iter_aql_items(aql_url: str, base_query: str, auth: Tuple[str, str]):
+    """
+    Yield AQL result items page by page using .offset()/.limit() pagination.
+
+    One giant query can hit gateway timeouts on big repos; bounded pages avoid
+    that, and the next page is prefetched on a worker thread so server-side
+    query time overlaps parsing of the current page. Pages are yielded in
+    offset order, and a server that ignores .offset()/.limit() is detected so
+    every row is still yielded exactly once. Raises RuntimeError if a page
+    fails after reporting the error.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    # First page synchronously: small repos fit in one page and need no threads
+    page = _fetch_aql_page(aql_url, base_query, auth, 0)
+    if page is None:
+        raise RuntimeError("AQL page fetch failed")
+    yield from page
+    if len(page) < _AQL_PAGE_SIZE:
+        return
+    prev_first_row = (page[0]['path'], page[0]['name'])
+
+    with ThreadPoolExecutor(max_workers=_AQL_MAX_CONCURRENT_PAGES) as executor:
+        next_offset = _AQL_PAGE_SIZE
+        pending = {}  # offset -> future, consumed in offset order
+        exhausted = False
+
+        while True:
+            while not exhausted and len(pending) < _AQL_MAX_CONCURRENT_PAGES:
+                pending[next_offset] = executor.submit(_fetch_aql_page, aql_url, base_query, auth, next_offset)
+                next_offset += _AQL_PAGE_SIZE
+
+            if not pending:
+                return
+
+            offset = min(pending)
+            page = pending.pop(offset).result()
+            if page is None:
+                for future in pending.values():
+                    future.cancel()
+                raise RuntimeError("AQL page fetch failed")
+
+            # Artifactory ignores .sort()/.offset()/.limit() when .include()
+            # references fields outside the item domain (e.g. stat.*), and
+            # every "page" is then the full result set. The first page already
+            # yielded everything in that case, so stop when a page restarts
+            # from the same first row instead of re-counting its rows (or
+            # looping forever on repos larger than a page)
+            first_row = (page[0]['path'], page[0]['name']) if page else None
+            if first_row == prev_first_row:
+                print("Warning: server ignored AQL offset/limit; using the complete first response", file=sys.stderr)
+                for future in pending.values():
+                    future.cancel()
+                return
+            prev_first_row = first_row
+
+            yield from page
+            if len(page) < _AQL_PAGE_SIZE:
+                exhausted = True
+                for future in pending.values():
+                    future.cancel()
+                pending.clear()
+
+
+def get_cached_npm_packages(base_url: str, repo_name: str, auth: Tuple[str, str] = None, debug: bool = False, since_days: int = None, include_stats: bool = False, package: str = None) -> Union[Dict[str, Set[str]], Dict[str, '_PackageStats']]:
     """
     Use JFrog AQL to query only cached npm artifacts in the repository.
-    Returns a dict mapping package names to sets of versions (or version stats dict).
+    Returns a dict mapping package names to sets of versions (or per-package
+    _PackageStats records).
     If since_days is provided, only returns packages downloaded in the last X days.
-    If include_stats is True, returns dict mapping package names to dict of {version: (created, last_downloaded, download_count)}.
+    If include_stats is True, returns dict mapping package names to _PackageStats
+    holding (version, created, last_downloaded, download_count) rows.
     Deduplicates entries with the same package+version, keeping the one with most downloads.
     """
     aql_url = f"{base_url}/api/search/aql"
@@ -264,8 +586,31 @@ def get_cached_npm_packages(base_url: str, repo_name: str, auth: Tuple[str, str]
         print(f"DEBUG MODE: Showing first 100 items in repository", file=sys.stderr)
     else:
         # Build file type condition for npm files (.json metadata and .tgz tarballs)
-        # JFrog stores npm packages in both formats
-        file_condition = '"$or": [{"name": {"$match": "*.json"}}, {"name": {"$match": "*.tgz"}}]'
+        # JFrog stores npm packages in both formats. package.json files carry
+        # no version info and are excluded server-side so their rows never
+        # cross the wire; the client-side check in parse_npm_metadata stays
+        # as a safety net.
+        file_condition = (
+            '"$and": ['
+            '{"$or": [{"name": {"$match": "*.json"}}, {"name": {"$match": "*.tgz"}}]}, '
+            '{"name": {"$nmatch": "package.json"}}]'
+        )
+
+        # Push a --package filter into the query: matching the known storage
+        # path layouts server-side keeps the other >99% of the repository off
+        # the wire entirely. Rows whose package name only appears in the
+        # filename are not path-matchable; main() retries without this
+        # predicate when the filtered query comes back empty, and its
+        # client-side filter does the narrowing.
+        if package:
+            package_condition = (
+                '"$or": ['
+                f'{{"path": {{"$match": ".npm/{package}"}}}}, '
+                f'{{"path": {{"$match": ".npm/{package}/*"}}}}, '
+                f'{{"path": {{"$match": "{package}/-"}}}}, '
+                f'{{"path": {{"$match": "*/{package}/-"}}}}]'
+            )
+            file_condition = f'"$and": [{{{file_condition}}}, {{{package_condition}}}]'
 
         # Determine what stats to include
         if include_stats or since_days:
@@ -275,96 +620,249 @@ def get_cached_npm_packages(base_url: str, repo_name: str, auth: Tuple[str, str]
 
         # Add date filter if requested
         if since_days:
-            from datetime import timezone
             cutoff_date = datetime.now(timezone.utc) - timedelta(days=since_days)
             # JFrog uses ISO 8601 format: YYYY-MM-DDTHH:MM:SS.sssZ
             cutoff_str = cutoff_date.strftime('%Y-%m-%dT%H:%M:%S.000Z')
-            aql_query = f'items.find({{"repo": "{repo_name}", {file_condition}, "stat.downloaded": {{"$gte": "{cutoff_str}"}}}}).include("name", "path", "repo"{stats_include})'
+            aql_query = f'items.find({{"repo": "{repo_name}", {file_condition}, "stat.downloaded": {{"$gte": "{cutoff_str}"}}}}).include("name", "path"{stats_include})'
             print(f"Filtering packages downloaded since {cutoff_str} ({since_days} days ago)", file=sys.stderr)
         else:
             # AQL query to find all npm files (.json metadata and .tgz tarballs)
-            aql_query = f'items.find({{"repo": "{repo_name}", {file_condition}}}).include("name", "path", "repo"{stats_include})'
+            aql_query = f'items.find({{"repo": "{repo_name}", {file_condition}}}).include("name", "path"{stats_include})'
 
     print(f"Querying cached artifacts in {repo_name}...", file=sys.stderr)
     if debug:
         print(f"AQL Query: {aql_query}", file=sys.stderr)
 
-    result = fetch_url(aql_url, auth, method='POST', data=aql_query.encode('utf-8'))
+    stream = None
+    if not debug:
+        # Paginated fetch; the next page is prefetched while this one parses
+        items = _iter_aql_items(aql_url, aql_query, auth)
+    elif ijson is not None:
+        # Debug query already carries .limit(100): fetch it in one shot.
+        # Stream-parse: items are yielded one at a time, so the full results
+        # array never needs to fit in memory
+        stream = fetch_url_stream(aql_url, auth, method='POST', data=aql_query.encode('utf-8'))
+        if stream is None:
+            return {}
+        items = ijson.items(stream, 'results.item')
+    else:
+        result = fetch_url(aql_url, auth, method='POST', data=aql_query.encode('utf-8'))
 
-    if not result:
-        return {}
+        if not result:
+            return {}
 
-    try:
-        data = json.loads(result)
-    except json.JSONDecodeError as e:
-        print(f"Error parsing JSON response: {e}", file=sys.stderr)
-        return {}
+        try:
+            data = _json_loads(result)
+        except ValueError as e:
+            print(f"Error parsing JSON response: {e}", file=sys.stderr)
+            return {}
 
-    if 'results' not in data:
-        print("No results found in AQL response", file=sys.stderr)
-        return {}
+        if 'results' not in data:
+            print("No results found in AQL response", file=sys.stderr)
+            return {}
 
-    print(f"Found {len(data['results'])} cached artifacts", file=sys.stderr)
+        items = data['results']
 
     if debug:
-        print("\nDEBUG: First 20 items in repository:", file=sys.stderr)
-        for item in data['results'][:20]:
+        # Materialize exactly 20 items for the preview, then chain them back
+        # in front of the remaining iterator so parsing resumes seamlessly
+        items = iter(items)
+        preview = list(islice(items, 20))
+        # Assemble the block and write it in one call rather than one
+        # syscall per line (stderr is unbuffered)
+        lines = ["\nDEBUG: First 20 items in repository:"]
+        for item in preview:
             item_type = item.get('type', 'unknown')
             path = item.get('path', '')
             name = item.get('name', '')
             stats = item.get('stats', [])
             downloaded = stats[0].get('downloaded') if stats else 'N/A'
-            print(f"  [{item_type}] {path}/{name} (downloaded: {downloaded})", file=sys.stderr)
-        print(file=sys.stderr)
+            lines.append(f"  [{item_type}] {path}/{name} (downloaded: {downloaded})")
+        lines.append('\n')
+        sys.stderr.write('\n'.join(lines))
+        items = chain(preview, items)
 
-    # Parse results and group by package name
-    packages = {}
+    # Parse results and group by package name. defaultdict removes the
+    # membership check per row
+    packages = defaultdict(_PackageStats) if include_stats else defaultdict(set)
+    item_count = 0
 
-    for item in data['results']:
-        filename = item.get('name', '')
-        path = item.get('path', '')
+    # Bind the parser to a local: the loop runs once per artifact and local
+    # loads are cheaper than module-global lookups
+    parse = parse_npm_metadata
 
-        # Skip folders
-        if item.get('type') == 'folder':
-            continue
+    # Unparseable-path debug lines are collected and written in one go after
+    # the loop; a write to unbuffered stderr per bad row would dominate the
+    # loop on repositories with many foreign artifacts
+    unparsed = []
 
-        # Extract package name and version from path and filename
-        package_name, version = parse_npm_metadata(path, filename)
+    try:
+        for item in items:
+            item_count += 1
+            # 'name' and 'path' are always in the .include() list, so direct
+            # subscripts are safe; a malformed row raises KeyError and lands
+            # in the except below with the rest of the stream errors
+            filename = item['name']
+            path = item['path']
+
+            # Extract package name and version from path and filename
+            package_name, version = parse(path, filename)
+
+            if not package_name or not version:
+                if debug:
+                    unparsed.append(f"DEBUG: Could not parse npm package from: {path}/{filename}")
+                continue
 
-        if not package_name or not version:
-            if debug:
-                print(f"DEBUG: Could not parse npm package from: {path}/{filename}", file=sys.stderr)
-            continue
+            # The same package name recurs once per cached version; interning
+            # collapses those copies and lets dict lookups hit the
+            # identity-comparison fast path (the maven extractor does the same)
+            package_name = sys.intern(package_name)
 
-        # Extract stats if requested
-        if include_stats:
-            # JFrog returns 'stats' (plural) as an array when requesting stat fields
-            stats = item.get('stats', [])
-            last_downloaded = stats[0].get('downloaded', 'Never') if stats else 'Never'
-            download_count = stats[0].get('downloads', 0) if stats else 0
-
-            # Get created date from item (not from stats)
-            created = item.get('created', 'Unknown')
-
-            # Add to packages dict with stats
-            # Use a dict to deduplicate: {(package, version): (created, last_downloaded, download_count)}
-            # Keep the entry with the highest download count
-            if package_name not in packages:
-                packages[package_name] = {}
-
-            # Deduplicate: if version exists, keep the one with more downloads
-            if version in packages[package_name]:
-                existing_created, existing_dl, existing_count = packages[package_name][version]
-                # Keep the entry with higher download count, or if equal, the one with a real download date
-                if download_count > existing_count or (download_count == existing_count and last_downloaded != 'Never' and existing_dl == 'Never'):
-                    packages[package_name][version] = (created, last_downloaded, download_count)
+            # Extract stats if requested
+            if include_stats:
+                # JFrog returns 'stats' (plural) as an array when requesting
+                # stat fields; it is omitted for never-downloaded artifacts,
+                # so this one stays a .get()
+                stats = item.get('stats')
+                last_downloaded = stats[0].get('downloaded', 'Never') if stats else 'Never'
+                download_count = stats[0].get('downloads', 0) if stats else 0
+
+                # Get created date from item (not from stats)
+                created = item.get('created', 'Unknown')
+
+                # Deduplicated per version inside _PackageStats: keep the
+                # entry with the highest download count
+                packages[package_name].add(version, created, last_downloaded, download_count)
             else:
-                packages[package_name][version] = (created, last_downloaded, download_count)
-        else:
-            # Add to packages dict without stats
-            if package_name not in packages:
-                packages[package_name] = set()
-            packages[package_name].add(version)
+                # Add to packages dict without stats
+                packages[package_name].add(version)
+
+    except Exception as e:
+        # Failed page fetch, or truncated/malformed JSON mid-stream
+        print(f"Error processing AQL response: {e}", file=sys.stderr)
+        return {}
+    finally:
+        if stream is not None:
+            stream.close()
+        if unparsed:
+            unparsed.append('')
+            sys.stderr.write('\n'.join(unparsed))
+
+    print(f"Found {item_count} cached artifacts", file=sys.stderr)
+
+    # Hand back a plain dict: downstream lookups on a defaultdict would
+    # silently create empty entries for missing keys
+    return dict(packages)
+
+
+class _PackageStats:
+    """
+    Per-package version stats in struct-of-arrays form.
+
+    Parallel lists plus a version->index map are markedly denser than a dict
+    of per-version (created, last_downloaded, count) tuples: download counts
+    pack into an int64 array.array and each version string is stored once.
+    """
+    __slots__ = ('index', 'versions', 'created', 'last_downloaded', 'downloads')
+
+    def __init__(self):
+        self.index = {}
+        self.versions = []
+        self.created = []
+        self.last_downloaded = []
+        self.downloads = array('q')
+
+    def add(self, version: str, created: str, last_downloaded: str, download_count: int):
+        """Record one row, deduplicating on version.
+
+        JFrog stores npm packages in multiple formats; duplicates keep the
+        entry with the most downloads (or, on a tie, the one with a real
+        download date).
+        """
+        idx = self.index.get(version)
+        if idx is None:
+            self.index[version] = len(self.versions)
+            self.versions.append(version)
+            self.created.append(created)
+            self.last_downloaded.append(last_downloaded)
+            self.downloads.append(download_count)
+        elif (download_count > self.downloads[idx]
+              or (download_count == self.downloads[idx]
+                  and last_downloaded != 'Never' and self.last_downloaded[idx] == 'Never')):
+            self.created[idx] = created
+            self.last_downloaded[idx] = last_downloaded
+            self.downloads[idx] = download_count
+
+    def rows(self):
+        """Yield (version, created, last_downloaded, download_count) rows."""
+        return zip(self.versions, self.created, self.last_downloaded, self.downloads)
+
+
+def _repo_freshness_marker(base_url: str, repo_name: str, auth: Tuple[str, str] = None) -> str:
+    """
+    Return the newest 'modified' timestamp in the repository, or None.
+    A single-row AQL query, used to decide whether a disk-cached result
+    is still current without re-downloading the full artifact listing.
+    """
+    aql_url = f"{base_url}/api/search/aql"
+    query = f'items.find({{"repo": "{repo_name}"}}).include("modified").sort({{"$desc": ["modified"]}}).limit(1)'
+    result = fetch_url(aql_url, auth, method='POST', data=query.encode('utf-8'))
+    if not result:
+        return None
+    try:
+        data = _json_loads(result)
+    except ValueError:
+        return None
+    results = data.get('results') or []
+    return results[0].get('modified') if results else None
+
+
+def _packages_cache_path(cache_dir: str, base_url: str, repo_name: str, since_days: int, include_stats: bool, package: str = None) -> str:
+    """Cache file path for one (repo, query shape) combination."""
+    key = f"{base_url}|{repo_name}|{since_days}|{include_stats}|{package}"
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, f"npm-{repo_name}-{digest}.pkl.gz")
+
+
+def get_cached_npm_packages_with_cache(base_url: str, repo_name: str, auth: Tuple[str, str] = None,
+                                       debug: bool = False, since_days: int = None,
+                                       include_stats: bool = False, package: str = None,
+                                       cache_dir: str = None):
+    """
+    Wrapper around get_cached_npm_packages that persists the parsed result
+    to cache_dir and reuses it while the repository's newest 'modified'
+    timestamp is unchanged, so re-runs that only change output flags skip
+    the full AQL download.
+    """
+    if not cache_dir or debug:
+        return get_cached_npm_packages(base_url, repo_name, auth, debug=debug,
+                                       since_days=since_days, include_stats=include_stats,
+                                       package=package)
+
+    cache_path = _packages_cache_path(cache_dir, base_url, repo_name, since_days, include_stats, package)
+    marker = _repo_freshness_marker(base_url, repo_name, auth)
+
+    if marker is not None and os.path.exists(cache_path):
+        try:
+            with gzip.open(cache_path, 'rb') as f:
+                cached_marker, packages = pickle.load(f)
+            if cached_marker == marker:
+                print(f"Using cached results for {repo_name} (unchanged since {marker})", file=sys.stderr)
+                return packages
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            pass  # corrupt or stale cache file: fall through and refetch
+
+    packages = get_cached_npm_packages(base_url, repo_name, auth, debug=debug,
+                                       since_days=since_days, include_stats=include_stats,
+                                       package=package)
+
+    if packages and marker is not None:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with gzip.open(cache_path, 'wb') as f:
+                pickle.dump((marker, packages), f)
+        except OSError as e:
+            print(f"Warning: could not write cache file {cache_path}: {e}", file=sys.stderr)
 
     return packages
 
@@ -374,22 +872,12 @@ def get_latest_version(versions: Set[str]) -> str:
     if not versions:
         return None
 
-    # Try using packaging library for proper version comparison
-    try:
-        from packaging.version import parse as parse_version
-        return str(max(versions, key=parse_version))
-    except ImportError:
-        # Fallback to simple sorting
-        def version_key(v):
-            parts = []
-            for part in re.split(r'[.\-]', v):
-                try:
-                    parts.append(int(part))
-                except ValueError:
-                    parts.append(part)
-            return parts
+    # Use the packaging library for proper version comparison when present
+    if _parse_version is not None:
+        return str(max(versions, key=_parse_version))
 
-        return sorted(versions, key=version_key)[-1]
+    # Single O(n) pass; no need to materialize a fully sorted list
+    return max(versions, key=_fallback_version_key)
 
 
 def main():
@@ -463,6 +951,11 @@ Note: This script queries ONLY cached artifacts in JFrog, not the upstream repos
         help='Output CSV file with download statistics (package, version, package_version, created, last_downloaded, download_count)'
     )
 
+    parser.add_argument(
+        '--cache-dir',
+        help='Directory for caching parsed results between runs; reused while the repository is unchanged (note: download statistics are only refreshed when repository contents change)'
+    )
+
     args = parser.parse_args()
 
     auth = None
@@ -477,9 +970,6 @@ Note: This script queries ONLY cached artifacts in JFrog, not the upstream repos
         base_url, repo_name = parse_artifactory_url(args.url)
         print(f"JFrog Base URL: {base_url}", file=sys.stderr)
         print(f"Repository: {repo_name}", file=sys.stderr)
-
-        # Get the actual repository name (may be different due to cache suffix)
-        actual_repo_name = get_actual_repo_name(base_url, repo_name, auth)
         print(file=sys.stderr)
     except ValueError as e:
         print(f"Error: {e}", file=sys.stderr)
@@ -490,7 +980,29 @@ Note: This script queries ONLY cached artifacts in JFrog, not the upstream repos
     include_stats = bool(args.csv_output)
     # Only apply since_days filter in AQL if NOT using CSV output (CSV gets all packages)
     aql_since_days = None if args.csv_output else args.since_days
-    packages = get_cached_npm_packages(base_url, actual_repo_name, auth, debug=args.debug, since_days=aql_since_days, include_stats=include_stats)
+    packages = get_cached_npm_packages_with_cache(base_url, repo_name, auth, debug=args.debug, since_days=aql_since_days, include_stats=include_stats, package=args.package, cache_dir=args.cache_dir)
+
+    if not packages and args.package:
+        # The server-side --package predicate only matches the known storage
+        # path layouts; repos that carry the package name solely in the
+        # filename (hash-style paths) come back empty even though the package
+        # is cached. Rescan without the predicate and let the client-side
+        # filter below do the narrowing
+        print(f"No server-side match for {args.package}, rescanning the full repository...", file=sys.stderr)
+        packages = get_cached_npm_packages_with_cache(base_url, repo_name, auth, debug=args.debug, since_days=aql_since_days, include_stats=include_stats, package=None, cache_dir=args.cache_dir)
+
+    if not packages:
+        # The given name is usually the physical one, so repo-name resolution
+        # is deferred: only when the first AQL query comes back empty do we
+        # ask the storage API whether JFrog maps the repo to another name
+        # (e.g. a -cache suffix) and retry. Saves a round-trip per run in the
+        # common case
+        actual_repo_name = get_actual_repo_name(base_url, repo_name, auth)
+        if actual_repo_name != repo_name:
+            packages = get_cached_npm_packages_with_cache(base_url, actual_repo_name, auth, debug=args.debug, since_days=aql_since_days, include_stats=include_stats, package=args.package, cache_dir=args.cache_dir)
+            if not packages and args.package:
+                print(f"No server-side match for {args.package}, rescanning the full repository...", file=sys.stderr)
+                packages = get_cached_npm_packages_with_cache(base_url, actual_repo_name, auth, debug=args.debug, since_days=aql_since_days, include_stats=include_stats, package=None, cache_dir=args.cache_dir)
 
     if not packages:
         if args.debug:
@@ -518,6 +1030,10 @@ Note: This script queries ONLY cached artifacts in JFrog, not the upstream repos
             sys.exit(1)
         packages = filtered
 
+    # Sort the package names once; both the CSV and text phases walk the
+    # same order, so there is no need to re-sort the full key set per phase
+    sorted_names = sorted(packages)
+
     # Handle CSV output (with statistics)
     if args.csv_output and not args.debug:
         try:
@@ -525,18 +1041,18 @@ Note: This script queries ONLY cached artifacts in JFrog, not the upstream repos
                 writer = csv.writer(csvfile)
                 writer.writerow(['package', 'version', 'package_version', 'created', 'last_downloaded', 'download_count'])
 
-                csv_rows = []
-                for package_name in sorted(packages.keys()):
-                    version_stats = packages[package_name]  # Dict of {version: (created, last_downloaded, download_count)}
-                    for version, (created, last_downloaded, download_count) in version_stats.items():
+                # Packages are visited in sorted order and versions sorted
+                # within each package, so rows come out already in the final
+                # (package, version) order -- no second full-list sort pass
+                csv_row_count = 0
+                for package_name in sorted_names:
+                    version_stats = packages[package_name]  # _PackageStats
+                    for version, created, last_downloaded, download_count in sorted(version_stats.rows()):
                         package_version = f"{package_name}@{version}"
-                        csv_rows.append([package_name, version, package_version, created, last_downloaded, download_count])
+                        writer.writerow([package_name, version, package_version, created, last_downloaded, download_count])
+                        csv_row_count += 1
 
-                # Sort by package, then version
-                csv_rows.sort(key=lambda x: (x[0], x[1]))
-                writer.writerows(csv_rows)
-
-            print(f"Successfully wrote {len(csv_rows)} package-version entries to {args.csv_output}", file=sys.stderr)
+            print(f"Successfully wrote {csv_row_count} package-version entries to {args.csv_output}", file=sys.stderr)
         except Exception as e:
             print(f"Error writing CSV file {args.csv_output}: {e}", file=sys.stderr)
             sys.exit(1)
@@ -548,11 +1064,19 @@ Note: This script queries ONLY cached artifacts in JFrog, not the upstream repos
         # If since_days is used with CSV output, we need to filter here
         cutoff_date_str = None
         if args.since_days and args.csv_output:
-            from datetime import timezone
             cutoff_date = datetime.now(timezone.utc) - timedelta(days=args.since_days)
             cutoff_date_str = cutoff_date.isoformat()
 
-        for package_name in sorted(packages.keys()):
+        # Pick the line formatter once instead of re-branching on
+        # args.format for every emitted line
+        if args.format == 'npm':
+            format_line = 'npm install {0}@{1}'.format
+        elif args.format == 'package-json':
+            format_line = '  "{0}": "{1}"'.format
+        else:  # simple
+            format_line = '{0}@{1}'.format
+
+        for package_name in sorted_names:
             version_data = packages[package_name]
 
             # Handle both data structures: set of strings or dict of version stats
@@ -562,11 +1086,11 @@ Note: This script queries ONLY cached artifacts in JFrog, not the upstream repos
                 if cutoff_date_str:
                     # Filter by date for text output
                     versions = set(
-                        v for v, (dl, dc) in version_data.items()
+                        v for v, created, dl, dc in version_data.rows()
                         if dl != 'Never' and dl >= cutoff_date_str
                     )
                 else:
-                    versions = set(version_data.keys())
+                    versions = set(version_data.versions)
             else:
                 versions = version_data
 
@@ -576,42 +1100,26 @@ Note: This script queries ONLY cached artifacts in JFrog, not the upstream repos
 
             if args.all_versions:
                 for version in sorted(versions):
-                    if args.format == 'npm':
-                        results.append(f"npm install {package_name}@{version}")
-                    elif args.format == 'package-json':
-                        results.append(f'  "{package_name}": "{version}"')
-                    else:  # simple
-                        results.append(f"{package_name}@{version}")
+                    results.append(format_line(package_name, version))
             else:
                 # Get latest version
                 latest = get_latest_version(versions)
                 if latest:
-                    if args.format == 'npm':
-                        results.append(f"npm install {package_name}@{latest}")
-                    elif args.format == 'package-json':
-                        results.append(f'  "{package_name}": "{latest}"')
-                    else:  # simple
-                        results.append(f"{package_name}@{latest}")
-
-        # Output results
+                    results.append(format_line(package_name, latest))
+
+        # Output results: one joined buffer and a single write instead of a
+        # per-line loop (package-json needs commas on all but the last line)
+        if args.format == 'package-json':
+            body = ',\n'.join(results) + '\n' if results else ''
+            payload = '{\n  "dependencies": {\n' + body + '  }\n}\n'
+        else:
+            payload = '\n'.join(results) + '\n' if results else ''
+
         if args.output:
             # Write to file
             try:
                 with open(args.output, 'w') as f:
-                    if args.format == 'package-json':
-                        f.write('{\n')
-                        f.write('  "dependencies": {\n')
-                    for i, result in enumerate(results):
-                        if args.format == 'package-json':
-                            if i < len(results) - 1:
-                                f.write(result + ',\n')
-                            else:
-                                f.write(result + '\n')
-                        else:
-                            f.write(result + '\n')
-                    if args.format == 'package-json':
-                        f.write('  }\n')
-                        f.write('}\n')
+                    f.write(payload)
                 print(f"Successfully wrote {len(results)} package{'s' if len(results) != 1 else ''} to {args.output}", file=sys.stderr)
             except Exception as e:
                 print(f"Error writing to file {args.output}: {e}", file=sys.stderr)
@@ -622,20 +1130,7 @@ Note: This script queries ONLY cached artifacts in JFrog, not the upstream repos
                 print("# Cached npm packages and versions:", file=sys.stderr)
                 print(file=sys.stderr)
 
-                if args.format == 'package-json':
-                    print('{')
-                    print('  "dependencies": {')
-                for i, result in enumerate(results):
-                    if args.format == 'package-json':
-                        if i < len(results) - 1:
-                            print(result + ',')
-                        else:
-                            print(result)
-                    else:
-                        print(result)
-                if args.format == 'package-json':
-                    print('  }')
-                    print('}')
+                sys.stdout.write(payload)
 
                 print(file=sys.stderr)
                 print(f"Total: {len(results)} package version{'s' if len(results) != 1 else ''}", file=sys.stderr)
@@ -7,29 +7,143 @@ Output format matches 'pip freeze' or 'uv pip freeze'.
 
 import argparse
 import csv
+import gzip
+import hashlib
 import json
+import os
+import pickle
 import re
 import sys
+from collections import defaultdict
 from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import chain, islice
 from typing import Dict, Set, Tuple, List, Optional
 from urllib.request import Request, urlopen
 from urllib.error import URLError, HTTPError
 
+# Use a pooled session with keep-alive if requests is available, so the
+# storage API call and the AQL POST to the same JFrog host reuse one TCP/TLS
+# connection
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    _SESSION = requests.Session()
+    _adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+    _SESSION.mount('http://', _adapter)
+    _SESSION.mount('https://', _adapter)
+    # AQL JSON is highly repetitive and compresses 5-10x; requests
+    # decompresses transparently
+    _SESSION.headers['Accept-Encoding'] = 'gzip, deflate'
+except ImportError:
+    requests = None
+    _SESSION = None
+
+# urllib3 without requests still provides a keep-alive connection pool
+if _SESSION is None:
+    try:
+        import urllib3
+
+        _POOL = urllib3.PoolManager(maxsize=4)
+    except ImportError:
+        urllib3 = None
+        _POOL = None
+else:
+    _POOL = None
+
+# ijson lets us parse the AQL response incrementally instead of buffering
+# the whole results array in memory
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# msgspec and orjson both decode large AQL responses several times faster
+# than stdlib json; prefer msgspec, then orjson, then stdlib. All three
+# raise ValueError subclasses on bad input.
+try:
+    import msgspec.json
+    _json_loads = msgspec.json.decode
+except ImportError:
+    try:
+        import orjson
+        _json_loads = orjson.loads
+    except ImportError:
+        _json_loads = json.loads
+
+
+@lru_cache(maxsize=8)
+def _auth_header(auth: Tuple[str, str]) -> str:
+    """Basic auth header value, encoded once per credential pair."""
+    import base64
+    return 'Basic ' + base64.b64encode(f"{auth[0]}:{auth[1]}".encode()).decode()
+
+
+def fetch_url(url: str, auth: Tuple[str, str] = None, method: str = 'GET', data: bytes = None) -> bytes:
+    """Fetch URL content as bytes with optional authentication.
 
-def fetch_url(url: str, auth: Tuple[str, str] = None, method: str = 'GET', data: bytes = None) -> str:
-    """Fetch URL content with optional authentication."""
+    Returning bytes avoids an O(N) decode of multi-megabyte AQL responses;
+    the JSON parsers accept bytes directly.
+    """
+    if _SESSION is not None:
+        try:
+            response = _SESSION.request(
+                method, url,
+                data=data,
+                auth=auth,
+                headers={'Content-Type': 'text/plain'} if data else None,
+                timeout=60,
+            )
+            response.raise_for_status()
+            return response.content
+        except requests.HTTPError as e:
+            code = e.response.status_code
+            print(f"HTTP Error {code} accessing {url}: {e.response.reason}", file=sys.stderr)
+            if code == 401:
+                print("Authentication failed. Please check your username and password.", file=sys.stderr)
+            if e.response.text:
+                print(f"Error details: {e.response.text}", file=sys.stderr)
+            return None
+        except requests.RequestException as e:
+            print(f"Error accessing {url}: {e}", file=sys.stderr)
+            return None
+
+    if _POOL is not None:
+        headers = {'Accept-Encoding': 'gzip, deflate'}
+        if data:
+            headers['Content-Type'] = 'text/plain'
+        if auth:
+            headers['Authorization'] = _auth_header(auth)
+        try:
+            response = _POOL.request(method, url, body=data, headers=headers, timeout=60)
+        except urllib3.exceptions.HTTPError as e:
+            print(f"Error accessing {url}: {e}", file=sys.stderr)
+            return None
+        if response.status >= 400:
+            print(f"HTTP Error {response.status} accessing {url}: {response.reason}", file=sys.stderr)
+            if response.status == 401:
+                print("Authentication failed. Please check your username and password.", file=sys.stderr)
+            if response.data:
+                print(f"Error details: {response.data.decode('utf-8', 'replace')}", file=sys.stderr)
+            return None
+        return response.data
+
+    # Fallback: plain urllib (new connection per call)
     try:
         req = Request(url, data=data, method=method)
         if auth:
-            import base64
-            credentials = base64.b64encode(f"{auth[0]}:{auth[1]}".encode()).decode()
-            req.add_header('Authorization', f'Basic {credentials}')
+            req.add_header('Authorization', _auth_header(auth))
 
         if data:
             req.add_header('Content-Type', 'text/plain')
+        req.add_header('Accept-Encoding', 'gzip')
 
         with urlopen(req, timeout=60) as response:
-            return response.read().decode('utf-8')
+            body = response.read()
+            if response.headers.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            return body
     except HTTPError as e:
         print(f"HTTP Error {e.code} accessing {url}: {e.reason}", file=sys.stderr)
         if e.code == 401:
@@ -50,6 +164,80 @@ def fetch_url(url: str, auth: Tuple[str, str] = None, method: str = 'GET', data:
         return None
 
 
+def fetch_url_stream(url: str, auth: Tuple[str, str] = None, method: str = 'GET', data: bytes = None):
+    """
+    Open URL and return a file-like object for incremental reads.
+    Returns None on error. The caller is responsible for closing it.
+    """
+    if _SESSION is not None:
+        try:
+            response = _SESSION.request(
+                method, url,
+                data=data,
+                auth=auth,
+                headers={'Content-Type': 'text/plain'} if data else None,
+                timeout=60,
+                stream=True,
+            )
+            response.raise_for_status()
+            # Transparently decompress so readers see plain JSON bytes
+            response.raw.decode_content = True
+            return response.raw
+        except requests.HTTPError as e:
+            code = e.response.status_code
+            print(f"HTTP Error {code} accessing {url}: {e.response.reason}", file=sys.stderr)
+            if code == 401:
+                print("Authentication failed. Please check your username and password.", file=sys.stderr)
+            return None
+        except requests.RequestException as e:
+            print(f"Error accessing {url}: {e}", file=sys.stderr)
+            return None
+
+    if _POOL is not None:
+        headers = {'Accept-Encoding': 'gzip, deflate'}
+        if data:
+            headers['Content-Type'] = 'text/plain'
+        if auth:
+            headers['Authorization'] = _auth_header(auth)
+        try:
+            response = _POOL.request(method, url, body=data, headers=headers,
+                                     timeout=60, preload_content=False)
+        except urllib3.exceptions.HTTPError as e:
+            print(f"Error accessing {url}: {e}", file=sys.stderr)
+            return None
+        if response.status >= 400:
+            print(f"HTTP Error {response.status} accessing {url}: {response.reason}", file=sys.stderr)
+            if response.status == 401:
+                print("Authentication failed. Please check your username and password.", file=sys.stderr)
+            response.release_conn()
+            return None
+        return response
+
+    # Fallback: plain urllib
+    try:
+        req = Request(url, data=data, method=method)
+        if auth:
+            req.add_header('Authorization', _auth_header(auth))
+        if data:
+            req.add_header('Content-Type', 'text/plain')
+        req.add_header('Accept-Encoding', 'gzip')
+        response = urlopen(req, timeout=60)
+        if response.headers.get('Content-Encoding') == 'gzip':
+            return gzip.GzipFile(fileobj=response)
+        return response
+    except HTTPError as e:
+        print(f"HTTP Error {e.code} accessing {url}: {e.reason}", file=sys.stderr)
+        if e.code == 401:
+            print("Authentication failed. Please check your username and password.", file=sys.stderr)
+        return None
+    except URLError as e:
+        print(f"URL Error accessing {url}: {e.reason}", file=sys.stderr)
+        return None
+    except Exception as e:
+        print(f"Error accessing {url}: {e}", file=sys.stderr)
+        return None
+
+
 def parse_artifactory_url(url: str) -> Tuple[str, str]:
     """
     Parse JFrog URL to extract base URL and repository name.
@@ -67,19 +255,17 @@ def parse_artifactory_url(url: str) -> Tuple[str, str]:
     if url.endswith('/simple'):
         url = url[:-7]
 
-    # Remove /api/pypi if present
-    if '/api/pypi/' in url:
-        parts = url.split('/api/pypi/')
-        base_url = parts[0]
-        repo_name = parts[1]
-    elif '/artifactory/' in url:
-        parts = url.split('/artifactory/')
-        base_url = parts[0] + '/artifactory'
-        repo_name = parts[1]
-    else:
-        raise ValueError(f"Cannot parse JFrog URL: {url}. Expected format: https://host/artifactory/repo-name")
+    # Remove /api/pypi if present. partition finds and splits in one pass
+    # without the substring pre-check or intermediate list of str.split
+    base_url, sep, repo_name = url.partition('/api/pypi/')
+    if sep:
+        return base_url, repo_name
 
-    return base_url, repo_name
+    base, sep, repo_name = url.partition('/artifactory/')
+    if sep:
+        return base + '/artifactory', repo_name
+
+    raise ValueError(f"Cannot parse JFrog URL: {url}. Expected format: https://host/artifactory/repo-name")
 
 
 def get_actual_repo_name(base_url: str, repo_name: str, auth: Tuple[str, str] = None) -> str:
@@ -92,75 +278,229 @@ def get_actual_repo_name(base_url: str, repo_name: str, auth: Tuple[str, str] =
 
     if result:
         try:
-            data = json.loads(result)
+            data = _json_loads(result)
             actual_name = data.get('repo')
             if actual_name and actual_name != repo_name:
                 print(f"Note: Repository name mapped from '{repo_name}' to '{actual_name}'", file=sys.stderr)
                 return actual_name
-        except json.JSONDecodeError:
+        except ValueError:
             pass
 
     return repo_name
 
 
+# Compiled once at import: this runs per version string in the fallback sort
+_VERSION_SPLIT_RE = re.compile(r'[.\-]')
+
+# packaging gives semantically correct version ordering (1.10 > 1.2);
+# fall back to simple numeric sorting if it is not installed. The parse is
+# memoized: common version strings recur across packages and packaging's
+# PEP 440 parse is regex-heavy.
+try:
+    from packaging.version import parse as _packaging_parse, InvalidVersion
+    _parse_version = lru_cache(maxsize=None)(_packaging_parse)
+except ImportError:
+    _parse_version = None
+    InvalidVersion = None
+
+
+@lru_cache(maxsize=None)
+def _fallback_version_key(v: str):
+    """Numeric-aware sort key used when packaging is not installed."""
+    parts = []
+    for part in _VERSION_SPLIT_RE.split(v):
+        try:
+            parts.append(int(part))
+        except ValueError:
+            parts.append(part)
+    return tuple(parts)
+
+
+@lru_cache(maxsize=None)
+def _version_sort_key(version: str):
+    """
+    Totally ordered sort key for version strings.
+
+    PEP 440 versions sort semantically and before ones packaging cannot
+    parse, which fall back to the numeric-aware tuple key.
+    """
+    if _parse_version is not None:
+        try:
+            return (0, _parse_version(version))
+        except InvalidVersion:
+            pass
+    return (1, _fallback_version_key(version))
+
+# Ordered longest-first so .tar.gz is stripped before .gz-style near misses
+_ARCHIVE_SUFFIXES = ('.tar.gz', '.tar.bz2', '.whl', '.zip', '.egg')
+
+
+def _strip_archive_suffix(filename: str) -> str:
+    """Remove a known sdist/wheel extension; unknown suffixes pass through."""
+    for suffix in _ARCHIVE_SUFFIXES:
+        if filename.endswith(suffix):
+            return filename[:-len(suffix)]
+    return filename
+
+
+def _version_boundary(stem: str) -> int:
+    """
+    Index of the first '-' that is followed by a digit, or -1.
+
+    PyPI distribution filenames are '{name}-{version}(-{wheel tags})', so the
+    first such boundary separates name from version — the same split the old
+    lazy regexes found, without engine dispatch or match-object allocation
+    per artifact.
+    """
+    idx = stem.find('-')
+    while idx != -1 and not stem[idx + 1:idx + 2].isdigit():
+        idx = stem.find('-', idx + 1)
+    return idx
+
+
+@lru_cache(maxsize=1 << 16)
+def parse_distribution_filename(filename: str) -> Tuple[str, str]:
+    """
+    Extract (package name, version) from a distribution filename in one scan.
+
+    Example:
+        certifi-2025.7.14.tar.gz -> ('certifi', '2025.7.14')
+        Jinja2-3.1.6-py3-none-any.whl -> ('jinja2', '3.1.6')
+
+    Returns (None, None) if the filename does not look like a distribution.
+    """
+    stem = _strip_archive_suffix(filename)
+
+    idx = _version_boundary(stem)
+    if idx <= 0:
+        return None, None
+
+    # Normalize name: replace underscores with hyphens, lowercase.
+    # Version runs to the next '-' (wheel tags like -py3-none-any follow it)
+    name = stem[:idx].replace('_', '-').lower()
+    version = stem[idx + 1:].split('-', 1)[0].strip('.-')
+    return name, (version or None)
+
+
 def parse_version_from_filename(filename: str) -> str:
     """Extract version from package filename."""
-    # Remove file extensions
-    name_without_ext = re.sub(r'\.(tar\.gz|tar\.bz2|zip|whl|egg)$', '', filename)
-
-    # Common patterns for version extraction
-    # Handle various formats: package-name-1.2.3, package_name-1.2.3, etc.
-    patterns = [
-        # Match versions with various suffixes (post, dev, a, b, rc)
-        r'-(\d+(?:\.\d+)*(?:\.post\d+)?(?:\.dev\d+)?(?:[abc]|rc|alpha|beta)?(?:\d+)?)',
-        # Match simple numeric versions
-        r'-(\d+(?:\.\d+)+)',
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, name_without_ext)
-        if match:
-            version = match.group(1)
-            # Clean up version (remove trailing dots, hyphens)
-            version = version.strip('.-')
-            if version:
-                return version
-
-    return None
-
-
-def extract_package_name_from_path(path: str) -> str:
+    return parse_distribution_filename(filename)[1]
+
+
+def extract_package_name_from_filename(filename: str) -> str:
     """
-    Extract package name from artifact path.
+    Extract package name from a distribution filename.
 
     Example:
-        packages/certifi/2025.7.14/certifi-2025.7.14.tar.gz -> certifi
-        simple/jinja2/Jinja2-3.1.6-py3-none-any.whl -> jinja2
+        certifi-2025.7.14.tar.gz -> certifi
+        Jinja2-3.1.6-py3-none-any.whl -> jinja2
     """
-    # Get the filename
-    filename = path.split('/')[-1]
+    return parse_distribution_filename(filename)[0]
+
+
+_AQL_PAGE_SIZE = 10000
+_AQL_MAX_CONCURRENT_PAGES = 4
 
-    # Remove extensions
-    name = re.sub(r'\.(tar\.gz|tar\.bz2|zip|whl|egg)$', '', filename)
 
-    # Extract package name (everything before the version pattern)
-    # Match pattern: name-version
-    match = re.match(r'^(.+?)-\d+', name)
-    if match:
-        package_name = match.group(1)
-        # Normalize: replace underscores with hyphens, lowercase
-        package_name = package_name.replace('_', '-').lower()
-        return package_name
+def _fetch_aql_page(aql_url: str, base_query: str, auth: Tuple[str, str], offset: int):
+    """Fetch and parse a single AQL page. Returns the result items, or None on error."""
+    paged_query = f'{base_query}.sort({{"$asc": ["path", "name"]}}).offset({offset}).limit({_AQL_PAGE_SIZE})'
 
-    return None
+    if ijson is not None:
+        stream = fetch_url_stream(aql_url, auth, method='POST', data=paged_query.encode('utf-8'))
+        if stream is None:
+            return None
+        try:
+            return list(ijson.items(stream, 'results.item'))
+        except Exception as e:
+            print(f"Error parsing JSON response: {e}", file=sys.stderr)
+            return None
+        finally:
+            stream.close()
+
+    result = fetch_url(aql_url, auth, method='POST', data=paged_query.encode('utf-8'))
+    if not result:
+        return None
+    try:
+        data = _json_loads(result)
+    except ValueError as e:
+        print(f"Error parsing JSON response: {e}", file=sys.stderr)
+        return None
+    return data.get('results', [])
 
 
-def get_cached_packages_aql(base_url: str, repo_name: str, auth: Tuple[str, str] = None, debug: bool = False, since_days: int = None, include_stats: bool = False):
+def _iter_aql_items(aql_url: str, base_query: str, auth: Tuple[str, str]):
+    """
+    Yield AQL result items page by page using .offset()/.limit() pagination.
+
+    One giant query can hit gateway timeouts on big repos; bounded pages avoid
+    that, and upcoming pages are prefetched on worker threads so server-side
+    query time overlaps parsing of the current page. Pages are yielded in
+    offset order, and a server that ignores .offset()/.limit() is detected so
+    every row is still yielded exactly once. Raises RuntimeError if a page
+    fails after reporting the error.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    # First page synchronously: small repos fit in one page and need no threads
+    page = _fetch_aql_page(aql_url, base_query, auth, 0)
+    if page is None:
+        raise RuntimeError("AQL page fetch failed")
+    yield from page
+    if len(page) < _AQL_PAGE_SIZE:
+        return
+    prev_first_row = (page[0]['path'], page[0]['name'])
+
+    with ThreadPoolExecutor(max_workers=_AQL_MAX_CONCURRENT_PAGES) as executor:
+        next_offset = _AQL_PAGE_SIZE
+        pending = {}  # offset -> future, consumed in offset order
+        exhausted = False
+
+        while True:
+            while not exhausted and len(pending) < _AQL_MAX_CONCURRENT_PAGES:
+                pending[next_offset] = executor.submit(_fetch_aql_page, aql_url, base_query, auth, next_offset)
+                next_offset += _AQL_PAGE_SIZE
+
+            if not pending:
+                return
+
+            offset = min(pending)
+            page = pending.pop(offset).result()
+            if page is None:
+                for future in pending.values():
+                    future.cancel()
+                raise RuntimeError("AQL page fetch failed")
+
+            # Artifactory ignores .sort()/.offset()/.limit() when .include()
+            # references fields outside the item domain (e.g. stat.*), and
+            # every "page" is then the full result set. The first page already
+            # yielded everything in that case, so stop when a page restarts
+            # from the same first row instead of re-counting its rows (or
+            # looping forever on repos larger than a page)
+            first_row = (page[0]['path'], page[0]['name']) if page else None
+            if first_row == prev_first_row:
+                print("Warning: server ignored AQL offset/limit; using the complete first response", file=sys.stderr)
+                for future in pending.values():
+                    future.cancel()
+                return
+            prev_first_row = first_row
+
+            yield from page
+            if len(page) < _AQL_PAGE_SIZE:
+                exhausted = True
+                for future in pending.values():
+                    future.cancel()
+                pending.clear()
+
+
+def get_cached_packages_aql(base_url: str, repo_name: str, auth: Tuple[str, str] = None, debug: bool = False, since_days: int = None, include_stats: bool = False, latest_only: bool = False, package: str = None):
     """
     Use JFrog AQL to query only cached artifacts in the repository.
     Returns a dict mapping package names to sets of versions (or version tuples with stats).
     If since_days is provided, only returns packages downloaded in the last X days.
     If include_stats is True, returns dict mapping package names to list of (version, last_downloaded, download_count) tuples.
+    If latest_only is True (and include_stats is not), keeps only the highest
+    version per package as a plain string instead of the full version set.
     """
     aql_url = f"{base_url}/api/search/aql"
 
@@ -173,6 +513,20 @@ def get_cached_packages_aql(base_url: str, repo_name: str, auth: Tuple[str, str]
         # Build file type condition
         file_condition = '"$or": [{"name": {"$match": "*.whl"}}, {"name": {"$match": "*.tar.gz"}}, {"name": {"$match": "*.tar.bz2"}}, {"name": {"$match": "*.zip"}}, {"name": {"$match": "*.egg"}}]'
 
+        # A single-package query only needs that package's rows; filtering
+        # server-side shrinks the response from the whole repo to one
+        # package's versions. Filenames use '-' or '_' interchangeably, so
+        # match both spellings as name prefixes. AQL $match is case-
+        # sensitive and distribution filenames often capitalize the name
+        # (PyYAML, Django), so main() retries without this predicate when
+        # the filtered query comes back empty and post-filters on the
+        # normalized name
+        if package:
+            variants = sorted({package, package.replace('-', '_'), package.replace('_', '-')})
+            package_condition = '"$or": [' + ', '.join(
+                f'{{"name": {{"$match": "{v}-*"}}}}' for v in variants) + ']'
+            file_condition = f'"$and": [{{{file_condition}}}, {{{package_condition}}}]'
+
         # Determine what stats to include
         if include_stats or since_days:
             stats_include = ', "stat.downloaded", "stat.downloads"'
@@ -185,36 +539,52 @@ def get_cached_packages_aql(base_url: str, repo_name: str, auth: Tuple[str, str]
             cutoff_date = datetime.now(timezone.utc) - timedelta(days=since_days)
             # JFrog uses ISO 8601 format: YYYY-MM-DDTHH:MM:SS.sssZ
             cutoff_str = cutoff_date.strftime('%Y-%m-%dT%H:%M:%S.000Z')
-            aql_query = f'items.find({{"repo": "{repo_name}", {file_condition}, "stat.downloaded": {{"$gte": "{cutoff_str}"}}}}).include("name", "path", "repo"{stats_include})'
+            aql_query = f'items.find({{"repo": "{repo_name}", {file_condition}, "stat.downloaded": {{"$gte": "{cutoff_str}"}}}}).include("name", "path"{stats_include})'
             print(f"Filtering packages downloaded since {cutoff_str} ({since_days} days ago)", file=sys.stderr)
         else:
             # AQL query to find all Python packages (wheels and source distributions)
-            aql_query = f'items.find({{"repo": "{repo_name}", {file_condition}}}).include("name", "path", "repo"{stats_include})'
+            aql_query = f'items.find({{"repo": "{repo_name}", {file_condition}}}).include("name", "path"{stats_include})'
 
     print(f"Querying cached artifacts in {repo_name}...", file=sys.stderr)
     if debug:
         print(f"AQL Query: {aql_query}", file=sys.stderr)
 
-    result = fetch_url(aql_url, auth, method='POST', data=aql_query.encode('utf-8'))
+    stream = None
+    if not debug:
+        # Bounded pages instead of one unbounded query; items are consumed
+        # as they are parsed so the full result set never sits in memory
+        items = _iter_aql_items(aql_url, aql_query, auth)
+    elif ijson is not None:
+        # Debug query already carries .limit(100): fetch it in one shot
+        stream = fetch_url_stream(aql_url, auth, method='POST', data=aql_query.encode('utf-8'))
+        if stream is None:
+            return {}
+        items = ijson.items(stream, 'results.item')
+    else:
+        result = fetch_url(aql_url, auth, method='POST', data=aql_query.encode('utf-8'))
 
-    if not result:
-        return {}
+        if not result:
+            return {}
 
-    try:
-        data = json.loads(result)
-    except json.JSONDecodeError as e:
-        print(f"Error parsing JSON response: {e}", file=sys.stderr)
-        return {}
+        try:
+            data = _json_loads(result)
+        except ValueError as e:
+            print(f"Error parsing JSON response: {e}", file=sys.stderr)
+            return {}
 
-    if 'results' not in data:
-        print("No results found in AQL response", file=sys.stderr)
-        return {}
+        if 'results' not in data:
+            print("No results found in AQL response", file=sys.stderr)
+            return {}
 
-    print(f"Found {len(data['results'])} cached artifacts", file=sys.stderr)
+        items = data['results']
 
     if debug:
+        # Materialize exactly 20 items for the preview, then chain them back
+        # in front of the remaining iterator so parsing resumes seamlessly
+        items = iter(items)
+        preview = list(islice(items, 20))
         print("\nDEBUG: First 20 items in repository:", file=sys.stderr)
-        for item in data['results'][:20]:
+        for item in preview:
             item_type = item.get('type', 'unknown')
             path = item.get('path', '')
             name = item.get('name', '')
@@ -222,57 +592,152 @@ def get_cached_packages_aql(base_url: str, repo_name: str, auth: Tuple[str, str]
             downloaded = stats[0].get('downloaded') if stats else 'N/A'
             print(f"  [{item_type}] {path}/{name} (downloaded: {downloaded})", file=sys.stderr)
         print(file=sys.stderr)
+        items = chain(preview, items)
+
+    # Parse results and group by package. defaultdict removes the
+    # membership check per row; latest_only stays a plain dict since it
+    # stores bare strings via .get()
+    if include_stats:
+        packages = defaultdict(dict)
+    elif latest_only:
+        packages = {}
+    else:
+        packages = defaultdict(set)
+    item_count = 0
 
-    # Parse results and group by package
-    packages = {}
-
-    for item in data['results']:
-        filename = item.get('name', '')
-        path = item.get('path', '')
-
-        # Skip folders
-        if item.get('type') == 'folder':
-            continue
-
-        # Extract package name
-        package_name = extract_package_name_from_path(f"{path}/{filename}")
-        if not package_name:
-            if debug:
-                print(f"DEBUG: Could not extract package name from: {path}/{filename}", file=sys.stderr)
-            continue
-
-        # Extract version
-        version = parse_version_from_filename(filename)
-        if not version:
-            if debug:
-                print(f"DEBUG: Could not extract version from: {filename}", file=sys.stderr)
-            continue
-
-        # Extract stats if requested
-        if include_stats:
-            stats = item.get('stats', [])
-            last_downloaded = stats[0].get('downloaded', 'Never') if stats else 'Never'
-            download_count = stats[0].get('downloads', 0) if stats else 0
-
-            # Aggregate per (package_name, version): sum downloads, keep latest download date
-            if package_name not in packages:
-                packages[package_name] = {}
-            key = version
-            if key not in packages[package_name]:
-                packages[package_name][key] = [version, last_downloaded, download_count]
+    # Bind the parser to a local: the loop runs once per artifact and local
+    # loads are cheaper than module-global lookups
+    parse = parse_distribution_filename
+
+    try:
+        for item in items:
+            item_count += 1
+            # 'name' and 'path' are always in the .include() list, so direct
+            # subscripts are safe; a malformed row raises KeyError into the
+            # except below
+            filename = item['name']
+            path = item['path']
+
+            # Extract package name and version in one scan: AQL's 'name'
+            # field is already the bare filename
+            package_name, version = parse(filename)
+            if not package_name or not version:
+                if debug:
+                    print(f"DEBUG: Could not parse package from: {path}/{filename}", file=sys.stderr)
+                continue
+
+            # latest_only keeps a single running-max version string per
+            # package instead of the full version set: O(1) memory per package
+            if latest_only and not include_stats:
+                cur = packages.get(package_name)
+                if cur is None or _version_sort_key(version) > _version_sort_key(cur):
+                    packages[package_name] = version
+                continue
+
+            # Extract stats if requested
+            if include_stats:
+                stats = item.get('stats', [])
+                last_downloaded = stats[0].get('downloaded', 'Never') if stats else 'Never'
+                download_count = stats[0].get('downloads', 0) if stats else 0
+
+                # Aggregate per (package_name, version): sum downloads, keep latest download date
+                version_stats = packages[package_name]
+                if version not in version_stats:
+                    version_stats[version] = [version, last_downloaded, download_count]
+                else:
+                    existing = version_stats[version]
+                    # Sum download counts
+                    existing[2] += download_count
+                    # Keep the most recent last_downloaded date
+                    if last_downloaded != 'Never':
+                        if existing[1] == 'Never' or last_downloaded > existing[1]:
+                            existing[1] = last_downloaded
             else:
-                existing = packages[package_name][key]
-                # Sum download counts
-                existing[2] += download_count
-                # Keep the most recent last_downloaded date
-                if last_downloaded != 'Never':
-                    if existing[1] == 'Never' or last_downloaded > existing[1]:
-                        existing[1] = last_downloaded
-        else:
-            # Add to packages dict without stats
-            if package_name not in packages:
-                packages[package_name] = set()
-            packages[package_name].add(version)
+                # Add to packages dict without stats
+                packages[package_name].add(version)
+
+    except Exception as e:
+        # Failed page fetch, or truncated/malformed JSON mid-stream
+        print(f"Error processing AQL response: {e}", file=sys.stderr)
+        return {}
+    finally:
+        if stream is not None:
+            stream.close()
+
+    print(f"Found {item_count} cached artifacts", file=sys.stderr)
+
+    # Hand back a plain dict: downstream lookups on a defaultdict would
+    # silently create empty entries for missing keys
+    return dict(packages)
+
+
+def _repo_freshness_marker(base_url: str, repo_name: str, auth: Tuple[str, str] = None) -> str:
+    """
+    Return the newest 'modified' timestamp in the repository, or None.
+    A single-row AQL query, used to decide whether a disk-cached result
+    is still current without re-downloading the full artifact listing.
+    """
+    aql_url = f"{base_url}/api/search/aql"
+    query = f'items.find({{"repo": "{repo_name}"}}).include("modified").sort({{"$desc": ["modified"]}}).limit(1)'
+    result = fetch_url(aql_url, auth, method='POST', data=query.encode('utf-8'))
+    if not result:
+        return None
+    try:
+        data = _json_loads(result)
+    except ValueError:
+        return None
+    results = data.get('results') or []
+    return results[0].get('modified') if results else None
+
+
+def _packages_cache_path(cache_dir: str, base_url: str, repo_name: str, since_days: int,
+                         include_stats: bool, latest_only: bool, package: str = None) -> str:
+    """Cache file path for one (repo, query shape) combination."""
+    key = f"{base_url}|{repo_name}|{since_days}|{include_stats}|{latest_only}|{package}"
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, f"pypi-{repo_name}-{digest}.pkl.gz")
+
+
+def get_cached_packages_aql_with_cache(base_url: str, repo_name: str, auth: Tuple[str, str] = None,
+                                       debug: bool = False, since_days: int = None,
+                                       include_stats: bool = False, latest_only: bool = False,
+                                       package: str = None, cache_dir: str = None):
+    """
+    Wrapper around get_cached_packages_aql that persists the parsed result
+    to cache_dir and reuses it while the repository's newest 'modified'
+    timestamp is unchanged, so re-runs that only change output flags skip
+    the full AQL download.
+    """
+    if not cache_dir or debug:
+        return get_cached_packages_aql(base_url, repo_name, auth, debug=debug,
+                                       since_days=since_days, include_stats=include_stats,
+                                       latest_only=latest_only, package=package)
+
+    cache_path = _packages_cache_path(cache_dir, base_url, repo_name, since_days,
+                                      include_stats, latest_only, package)
+    marker = _repo_freshness_marker(base_url, repo_name, auth)
+
+    if marker is not None and os.path.exists(cache_path):
+        try:
+            with gzip.open(cache_path, 'rb') as f:
+                cached_marker, packages = pickle.load(f)
+            if cached_marker == marker:
+                print(f"Using cached results for {repo_name} (unchanged since {marker})", file=sys.stderr)
+                return packages
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            pass  # corrupt or stale cache file: fall through and refetch
+
+    packages = get_cached_packages_aql(base_url, repo_name, auth, debug=debug,
+                                       since_days=since_days, include_stats=include_stats,
+                                       latest_only=latest_only, package=package)
+
+    if packages and marker is not None:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with gzip.open(cache_path, 'wb') as f:
+                pickle.dump((marker, packages), f)
+        except OSError as e:
+            print(f"Warning: could not write cache file {cache_path}: {e}", file=sys.stderr)
 
     return packages
 
@@ -292,8 +757,8 @@ def get_cached_packages_storage_api(base_url: str, repo_name: str, auth: Tuple[s
         return {}
 
     try:
-        json.loads(result)  # Validate JSON but don't use it yet
-    except json.JSONDecodeError:
+        _json_loads(result)  # Validate JSON but don't use it yet
+    except ValueError:
         print("Error parsing storage API response", file=sys.stderr)
         return {}
 
@@ -308,23 +773,11 @@ def get_latest_version(versions: Set[str]) -> str:
     if not versions:
         return None
 
-    # Try using packaging library for proper version comparison
-    try:
-        from packaging.version import parse as parse_version
-        return str(max(versions, key=parse_version))
-    except ImportError:
-        # Fallback to simple sorting
-        # Sort by version parts as integers where possible
-        def version_key(v):
-            parts = []
-            for part in re.split(r'[.\-]', v):
-                try:
-                    parts.append(int(part))
-                except ValueError:
-                    parts.append(part)
-            return parts
+    if _parse_version is not None:
+        return max(versions, key=_parse_version)
 
-        return sorted(versions, key=version_key)[-1]
+    # Fallback: numeric-aware comparison without packaging
+    return max(versions, key=_fallback_version_key)
 
 
 def main():
@@ -392,6 +845,11 @@ Note: This script queries ONLY cached artifacts in JFrog, not the upstream repos
         help='Output CSV file with download statistics (package, version, package_version, last_downloaded, download_count)'
     )
 
+    parser.add_argument(
+        '--cache-dir',
+        help='Directory for caching parsed results between runs; reused while the repository is unchanged (note: download statistics are only refreshed when repository contents change)'
+    )
+
     args = parser.parse_args()
 
     auth = None
@@ -406,9 +864,6 @@ Note: This script queries ONLY cached artifacts in JFrog, not the upstream repos
         base_url, repo_name = parse_artifactory_url(args.url)
         print(f"JFrog Base URL: {base_url}", file=sys.stderr)
         print(f"Repository: {repo_name}", file=sys.stderr)
-
-        # Get the actual repository name (may be different due to cache suffix)
-        actual_repo_name = get_actual_repo_name(base_url, repo_name, auth)
         print(file=sys.stderr)
     except ValueError as e:
         print(f"Error: {e}", file=sys.stderr)
@@ -419,7 +874,32 @@ Note: This script queries ONLY cached artifacts in JFrog, not the upstream repos
     include_stats = bool(args.csv_output)
     # Only apply since_days filter in AQL if NOT using CSV output (CSV gets all packages)
     aql_since_days = None if args.csv_output else args.since_days
-    packages = get_cached_packages_aql(base_url, actual_repo_name, auth, debug=args.debug, since_days=aql_since_days, include_stats=include_stats)
+    # Without --all-versions or stats, only the newest version per package is
+    # ever printed, so keep a running max during ingest instead of full sets
+    latest_only = not args.all_versions and not include_stats
+    packages = get_cached_packages_aql_with_cache(base_url, repo_name, auth, debug=args.debug, since_days=aql_since_days, include_stats=include_stats, latest_only=latest_only, package=args.package, cache_dir=args.cache_dir)
+
+    if not packages:
+        # The given name is usually the physical one, so repo-name resolution
+        # is deferred: only when the first AQL query comes back empty do we
+        # ask the storage API whether JFrog maps the repo to another name
+        # (e.g. a -cache suffix) and retry. Saves a round-trip per run in the
+        # common case
+        actual_repo_name = get_actual_repo_name(base_url, repo_name, auth)
+        if actual_repo_name != repo_name:
+            repo_name = actual_repo_name
+            packages = get_cached_packages_aql_with_cache(base_url, repo_name, auth, debug=args.debug, since_days=aql_since_days, include_stats=include_stats, latest_only=latest_only, package=args.package, cache_dir=args.cache_dir)
+
+    if args.package and not args.debug and args.package.replace('_', '-').lower() not in packages:
+        # The server-side --package predicate is case-sensitive ($match) and
+        # only covers -/_ spellings, so capitalized filenames (PyYAML-6.0.tar.gz)
+        # slip past it. Prefix siblings (django-filter for django) can still
+        # match, so an empty result is not a reliable signal: whenever the
+        # requested package is absent from the filtered result, rescan
+        # without the predicate and let the normalized client-side filter
+        # below do the narrowing
+        print(f"No server-side match for {args.package}, rescanning the full repository...", file=sys.stderr)
+        packages = get_cached_packages_aql_with_cache(base_url, repo_name, auth, debug=args.debug, since_days=aql_since_days, include_stats=include_stats, latest_only=latest_only, package=None, cache_dir=args.cache_dir)
 
     if not packages:
         if args.debug:
@@ -483,6 +963,11 @@ Note: This script queries ONLY cached artifacts in JFrog, not the upstream repos
         for package_name in sorted(packages.keys()):
             version_data = packages[package_name]
 
+            # latest_only already reduced each entry to one version string
+            if latest_only:
+                results.append(f"{package_name}=={version_data}")
+                continue
+
             # Handle both data structures: set of strings or list of tuples
             if include_stats:
                 # Extract versions from aggregated dict (version -> [version, last_downloaded, download_count])
@@ -509,13 +994,15 @@ Note: This script queries ONLY cached artifacts in JFrog, not the upstream repos
                 if latest:
                     results.append(f"{package_name}=={latest}")
 
-        # Output results
+        # Output results: one joined buffer and a single write instead of a
+        # per-line loop
+        payload = '\n'.join(results) + '\n' if results else ''
+
         if args.output:
             # Write to file
             try:
-                with open(args.output, 'w') as f:
-                    for result in results:
-                        f.write(result + '\n')
+                with open(args.output, 'w', buffering=1 << 20) as f:
+                    f.write(payload)
                 print(f"Successfully wrote {len(results)} package{'s' if len(results) != 1 else ''} to {args.output}", file=sys.stderr)
             except Exception as e:
                 print(f"Error writing to file {args.output}: {e}", file=sys.stderr)
@@ -526,8 +1013,7 @@ Note: This script queries ONLY cached artifacts in JFrog, not the upstream repos
                 print("# Cached packages and versions:", file=sys.stderr)
                 print(file=sys.stderr)
 
-                for result in results:
-                    print(result)
+                sys.stdout.write(payload)
 
                 print(file=sys.stderr)
                 print(f"Total: {len(results)} package version{'s' if len(results) != 1 else ''}", file=sys.stderr)
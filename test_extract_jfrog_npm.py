@@ -60,6 +60,11 @@ def test_digit_suffix_openapi_3_0():
 def test_digit_suffix_unscoped():
     assert parse_npm_metadata('hash1/hash2/express2/-', 'express2-4.18.2.tgz') == ('express2', '4.18.2')
 
+def test_digit_suffix_filename_only():
+    # package name only available in the filename; the right-anchored split
+    # finds the last '-<digit>' boundary instead of the first
+    assert parse_npm_metadata('hash1/hash2', 'apidom-ns-openapi-3-0-1.0.0-beta.48.tgz') == ('apidom-ns-openapi-3-0', '1.0.0-beta.48')
+
 
 # --- Skip/reject cases ---
 
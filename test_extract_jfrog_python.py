@@ -0,0 +1,38 @@
+import pytest
+from extract_jfrog_python import extract_package_name_from_filename, parse_version_from_filename
+
+
+# --- Package name extraction ---
+
+def test_name_sdist():
+    assert extract_package_name_from_filename('certifi-2025.7.14.tar.gz') == 'certifi'
+
+def test_name_wheel_with_tags():
+    assert extract_package_name_from_filename('Jinja2-3.1.6-py3-none-any.whl') == 'jinja2'
+
+def test_name_underscores_normalized():
+    assert extract_package_name_from_filename('typing_extensions-4.12.2-py3-none-any.whl') == 'typing-extensions'
+
+def test_name_multi_hyphen():
+    assert extract_package_name_from_filename('google-cloud-storage-2.14.0.tar.gz') == 'google-cloud-storage'
+
+def test_name_no_version():
+    assert extract_package_name_from_filename('README.txt') is None
+
+
+# --- Version extraction ---
+
+def test_version_sdist():
+    assert parse_version_from_filename('certifi-2025.7.14.tar.gz') == '2025.7.14'
+
+def test_version_wheel_tags_trimmed():
+    assert parse_version_from_filename('Jinja2-3.1.6-py3-none-any.whl') == '3.1.6'
+
+def test_version_prerelease_suffix():
+    assert parse_version_from_filename('foo-1.2.3rc1.tar.gz') == '1.2.3rc1'
+
+def test_version_post_release():
+    assert parse_version_from_filename('bar-2.0.post1.tar.gz') == '2.0.post1'
+
+def test_version_missing():
+    assert parse_version_from_filename('no-version-here.txt') is None